@@ -87,12 +87,49 @@ class ExportW3D(bpy.types.Operator, ExportHelper, ReportHelper):
         name='Compression',
         items=(('U', 'Uncompressed', 'This will not compress the animations'),
                ('TC', 'TimeCoded', 'This will export the animation with keyframes'),
-               # ('AD', 'AdaptiveDelta',
-               # 'This will use adaptive delta compression to reduce size'),
+               ('AD', 'AdaptiveDelta',
+                'This will use adaptive delta compression to reduce size'),
+               ('MC', 'MotionChannels',
+                'This will use compressed motion channels (BFME engine only) to reduce size'),
+               ('AUTO', 'Automatic',
+                'This will pick the smallest of the uncompressed, timecoded and adaptive delta methods '
+                'within the tolerances'),
                ),
         description='The method used for compressing the animation data',
         default='U')
 
+    translation_tolerance: FloatProperty(
+        name='Translation Tolerance',
+        description='Maximum deviation of compressed translations from the original ones',
+        default=0.001,
+        min=0.0,
+        precision=4)
+
+    rotation_tolerance: FloatProperty(
+        name='Rotation Tolerance',
+        description='Maximum deviation of compressed rotations from the original ones (in degrees)',
+        default=0.1,
+        min=0.0,
+        precision=3)
+
+    reduce_keyframes: BoolProperty(
+        name='Reduce Keyframes',
+        description='Drop keyframes that interpolation reproduces within the tolerances',
+        default=False)
+
+    eliminate_channels: BoolProperty(
+        name='Remove Redundant Channels',
+        description='Remove channels in bind pose and reduce constant channels to a single key',
+        default=False)
+
+    resample_animation: BoolProperty(
+        name='Resample Animation',
+        description='Resample the animation from the scene frame rate to the given frame rate',
+        default=False)
+
+    frame_rate: IntProperty(
+        name='Frame Rate', description='Frame rate of the exported animation', default=15, min=1)
+
     force_vertex_materials: BoolProperty(
         name='Force Vertex Materials', description='Export all materials as Vertex Materials only', default=False)
 
@@ -137,6 +174,11 @@ class ExportW3D(bpy.types.Operator, ExportHelper, ReportHelper):
 
         export_settings = {'mode': self.export_mode,
                            'compression': self.animation_compression,
+                           'translation_tolerance': self.translation_tolerance,
+                           'rotation_tolerance': self.rotation_tolerance,
+                           'reduce_keyframes': self.reduce_keyframes,
+                           'eliminate_channels': self.eliminate_channels,
+                           'frame_rate': self.frame_rate if self.resample_animation else None,
                            'use_existing_skeleton': self.use_existing_skeleton,
                            'individual_files': self.individual_files,
                            'create_texture_xmls': self.create_texture_xmls}
@@ -173,6 +215,16 @@ class ExportW3D(bpy.types.Operator, ExportHelper, ReportHelper):
     def draw_animation_settings(self):
         col = self.layout.box().column()
         col.prop(self, 'animation_compression')
+        if self.animation_compression == 'TC':
+            col.prop(self, 'reduce_keyframes')
+        col.prop(self, 'eliminate_channels')
+        col.prop(self, 'resample_animation')
+        if self.resample_animation:
+            col.prop(self, 'frame_rate')
+        if self.animation_compression in ['AD', 'MC', 'AUTO'] or self.eliminate_channels \
+                or (self.animation_compression == 'TC' and self.reduce_keyframes):
+            col.prop(self, 'translation_tolerance')
+            col.prop(self, 'rotation_tolerance')
 
     def draw_force_vertex_materials(self):
         col = self.layout.box().column()
@@ -197,16 +249,44 @@ class ImportW3D(bpy.types.Operator, ImportHelper, ReportHelper):
 
     filter_glob: StringProperty(default='*.w3d;*.w3x', options={'HIDDEN'})
 
+    use_frame_range: BoolProperty(
+        name='Limit Frame Range',
+        description='Only import the animation frames within the given range',
+        default=False)
+
+    first_frame: IntProperty(name='First Frame', description='First animation frame to import', default=0, min=0)
+
+    last_frame: IntProperty(name='Last Frame', description='Last animation frame to import', default=0, min=0)
+
+    resample_animation: BoolProperty(
+        name='Resample Animation',
+        description='Resample the animation from its own frame rate to the given frame rate',
+        default=False)
+
+    frame_rate: IntProperty(
+        name='Frame Rate', description='Frame rate of the imported animation', default=30, min=1)
+
+    reuse_materials: BoolProperty(
+        name='Reuse Materials',
+        description='Reuse identical materials created by earlier imports of this session',
+        default=False)
+
     def execute(self, context):
         print_version(self.info)
+        import_settings = {'frame_range': None, 'frame_rate': None, 'reuse_materials': self.reuse_materials}
+        if self.use_frame_range:
+            import_settings['frame_range'] = (self.first_frame, max(self.first_frame, self.last_frame))
+        if self.resample_animation:
+            import_settings['frame_rate'] = self.frame_rate
+
         if self.filepath.lower().endswith('.w3d'):
             from .w3d.import_w3d import load
             file_format = 'W3D'
-            load(self)
+            load(self, import_settings)
         else:
             from .w3x.import_w3x import load
             file_format = 'W3X'
-            load(self)
+            load(self, import_settings)
 
         self.info('finished')
         return {'FINISHED'}
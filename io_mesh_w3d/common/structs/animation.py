@@ -1,6 +1,7 @@
 # <pep8 compliant>
 # Written by Stephan Vedder and Michael Schnabel
 
+import numpy as np
 from io_mesh_w3d.w3d.structs.version import Version
 from io_mesh_w3d.w3d.utils.helpers import *
 from io_mesh_w3d.w3x.io_xml import *
@@ -13,6 +14,16 @@ CHANNEL_Z = 2
 CHANNEL_Q = 6
 CHANNEL_VIS = 15
 
+# values of a visibility channel from this on count as visible
+VISIBILITY_THRESHOLD = 0.5
+
+
+def frame_window(first_frame, last_frame, window_start, window_end):
+    # channels outside of the window keep their closest frame, it holds the value inside of it
+    start = min(max(window_start, first_frame), last_frame)
+    end = max(min(window_end, last_frame), start)
+    return start, end
+
 
 class AnimationHeader:
     def __init__(self, version=Version(major=4, minor=1), name='', hierarchy_name='', num_frames=0, frame_rate=0):
@@ -152,6 +163,17 @@ class AnimationChannel:
             for value in self.data:
                 create_quaternion(value, channel, 'Frame')
 
+    def crop(self, first_frame, last_frame):
+        first, last = frame_window(self.first_frame, self.last_frame, first_frame, last_frame)
+        return AnimationChannel(
+            first_frame=first,
+            last_frame=last,
+            vector_len=self.vector_len,
+            type=self.type,
+            pivot=self.pivot,
+            unknown=self.unknown,
+            data=self.data[first - self.first_frame:last + 1 - self.first_frame])
+
 
 W3D_CHUNK_ANIMATION_BIT_CHANNEL = 0x00000203
 
@@ -175,20 +197,13 @@ class AnimationBitChannel:
             default=float(read_ubyte(io_stream) / 255))
 
         num_frames = result.last_frame - result.first_frame + 1
-        result.data = [float] * num_frames
-        temp = 0
-        for i in range(num_frames):
-            if i % 8 == 0:
-                temp = read_ubyte(io_stream)
-            val = (temp & (1 << (i % 8))) != 0
-            result.data[i] = val
+        bits = np.frombuffer(io_stream.read((num_frames + 7) // 8), dtype=np.uint8)
+        result.data = np.unpackbits(bits, count=num_frames, bitorder='little').astype(bool).tolist()
         return result
 
     def size(self, include_head=True):
         size = const_size(9, include_head)
-        size += int(len(self.data) / 8)
-        if len(self.data) % 8 > 0:
-            size += 1
+        size += (len(self.data) + 7) // 8
         return size
 
     def write(self, io_stream):
@@ -199,13 +214,8 @@ class AnimationBitChannel:
         write_ushort(self.pivot, io_stream)
         write_ubyte(int(self.default * 255), io_stream)
 
-        value = 0x00
-        for i, datum in enumerate(self.data):
-            if i > 0 and i % 8 == 0:
-                write_ubyte(value, io_stream)
-                value = 0x00
-            value |= (int(datum) << (i % 8))
-        write_ubyte(value, io_stream)
+        bits = np.asarray(self.data, dtype=np.float64).astype(np.int64) != 0
+        io_stream.write(np.packbits(bits, bitorder='little').tobytes())
 
     @staticmethod
     def parse(xml_bit_channel):
@@ -231,6 +241,16 @@ class AnimationBitChannel:
         for value in self.data:
             create_value(value, channel, 'Frame')
 
+    def crop(self, first_frame, last_frame):
+        first, last = frame_window(self.first_frame, self.last_frame, first_frame, last_frame)
+        return AnimationBitChannel(
+            first_frame=first,
+            last_frame=last,
+            type=self.type,
+            pivot=self.pivot,
+            default=self.default,
+            data=self.data[first - self.first_frame:last + 1 - self.first_frame])
+
 
 W3D_CHUNK_ANIMATION = 0x00000200
 
@@ -318,3 +338,9 @@ class Animation:
         channels = create_node(animation, 'Channels')
         for channel in self.channels:
             channel.create(channels)
+
+    def crop(self, first_frame, last_frame):
+        # frames keep their numbers, channels only hold what is needed to evaluate [first_frame, last_frame]
+        return Animation(
+            header=self.header,
+            channels=[channel.crop(first_frame, last_frame) for channel in self.channels])
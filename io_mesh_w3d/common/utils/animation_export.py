@@ -6,6 +6,7 @@ from mathutils import Quaternion
 from io_mesh_w3d.common.utils.helpers import *
 from io_mesh_w3d.common.structs.animation import *
 from io_mesh_w3d.w3d.structs.compressed_animation import *
+from io_mesh_w3d.w3d.utils.animation_compression import create_time_coded_bit_channel, continuous_quaternions
 
 
 def is_translation(channel_type):
@@ -20,6 +21,27 @@ def is_visibility(fcu):
     return 'visibility' in fcu.data_path or 'hide' in fcu.data_path
 
 
+def retrieve_time_coded_bit_channel(fcu, pivot_index):
+    start_frame = bpy.context.scene.frame_start
+    end_frame = bpy.context.scene.frame_end
+
+    channel = AnimationBitChannel(
+        first_frame=start_frame,
+        last_frame=end_frame,
+        pivot=pivot_index,
+        data=[fcu.evaluate(frame) for frame in range(start_frame, end_frame + 1)])
+    return create_time_coded_bit_channel(channel, end_frame + 1)
+
+
+def make_continuous(channel):
+    if isinstance(channel, TimeCodedAnimationChannel):
+        values = continuous_quaternions([datum.value for datum in channel.time_codes])
+        for datum, value in zip(channel.time_codes, values.tolist()):
+            datum.value = Quaternion(value)
+    else:
+        channel.data = [Quaternion(value) for value in continuous_quaternions(channel.data).tolist()]
+
+
 def retrieve_channels(obj, hierarchy, timecoded, name=None):
     if obj.animation_data is None or obj.animation_data.action is None:
         return []
@@ -51,6 +73,9 @@ def retrieve_channels(obj, hierarchy, timecoded, name=None):
 
         if is_visibility(fcu):
             channel_type = CHANNEL_VIS
+            if timecoded:
+                channels.append(retrieve_time_coded_bit_channel(fcu, pivot_index))
+                continue
 
         if not (channel_type == 6 and fcu.array_index > 0):
             if timecoded:
@@ -112,6 +137,9 @@ def retrieve_channels(obj, hierarchy, timecoded, name=None):
                 if fcu.array_index == 3:
                     channel.data[i].normalize()
 
+        if channel_type == CHANNEL_Q and fcu.array_index == 3:
+            make_continuous(channel)
+
         if is_translation(channel_type) or fcu.array_index == 3 or is_visibility(fcu):
             channels.append(channel)
     return channels
@@ -137,7 +165,8 @@ def retrieve_animation(context, animation_name, hierarchy, rig, timecoded):
     if timecoded:
         ani_struct = CompressedAnimation(
             header=CompressedAnimationHeader(flavor=TIME_CODED_FLAVOR),
-            time_coded_channels=channels)
+            time_coded_channels=[channel for channel in channels if isinstance(channel, TimeCodedAnimationChannel)],
+            time_coded_bit_channels=[channel for channel in channels if isinstance(channel, TimeCodedBitChannel)])
     else:
         ani_struct = Animation(header=AnimationHeader(), channels=channels)
 
@@ -2,7 +2,10 @@
 # Written by Stephan Vedder and Michael Schnabel
 
 import bpy
+import numpy as np
 from io_mesh_w3d.w3d.adaptive_delta import decode
+from io_mesh_w3d.common.utils.animation_resampling import resample_animation, is_visibility
+from io_mesh_w3d.w3d.utils.animation_compression import continuous_quaternions
 from io_mesh_w3d.common.structs.animation import *
 from io_mesh_w3d.w3d.structs.compressed_animation import *
 
@@ -15,131 +18,245 @@ def is_translation(channel):
     return channel.type < 3
 
 
-def is_visibility(channel):
-    return isinstance(channel, AnimationBitChannel) or channel.type == CHANNEL_VIS
+def create_bone_lookup(rig, hierarchy):
+    # pivot index -> pose bone and bone, the roottransform is animated on the rig itself
+    pose_bones = [rig] + [rig.pose.bones.get(pivot.name) for pivot in hierarchy.pivots[1:]]
+    bones = [rig] + [rig.data.bones.get(pivot.name) for pivot in hierarchy.pivots[1:]]
+    return pose_bones, bones
 
 
-def get_bone(context, rig, hierarchy, channel):
-    if is_roottransform(channel):
-        if is_visibility(channel):
-            context.warning(
-                f'armature \'{hierarchy.name()}\' might have been hidden due to visibility animation channels!')
-        return rig
+def get_bone(bone_lookup, channel):
+    pose_bones, bones = bone_lookup
+    if channel.pivot >= len(pose_bones):
+        return None
+
+    if is_visibility(channel) and bones[channel.pivot] is not None:
+        return bones[channel.pivot]
+    return pose_bones[channel.pivot]
+
 
-    if channel.pivot >= len(hierarchy.pivots):
+def validate_channels(context, hierarchy, channels, bone_lookup):
+    if any(is_roottransform(channel) and is_visibility(channel) for channel in channels):
         context.warning(
-            f'animation channel for bone with ID \'{channel.pivot}\' is invalid -> armature has only {len(hierarchy.pivots)} bones!')
-        return None
-    pivot = hierarchy.pivots[channel.pivot]
+            f'armature \'{hierarchy.name()}\' might have been hidden due to visibility animation channels!')
 
-    if is_visibility(channel) and pivot.name in rig.data.bones:
-        return rig.data.bones[pivot.name]
-    return rig.pose.bones[pivot.name]
+    for pivot in sorted({channel.pivot for channel in channels if channel.pivot >= len(hierarchy.pivots)}):
+        context.warning(
+            f'animation channel for bone with ID \'{pivot}\' is invalid -> '
+            f'armature has only {len(hierarchy.pivots)} bones!')
 
+    pose_bones = bone_lookup[0]
+    for pivot in sorted({channel.pivot for channel in channels if channel.pivot < len(pose_bones)}):
+        if pose_bones[pivot] is None:
+            context.warning(f'animation channel for bone \'{hierarchy.pivots[pivot].name}\' is skipped -> '
+                            f'armature \'{hierarchy.name()}\' has no such bone!')
 
-def setup_animation(animation):
+
+def setup_animation(animation, frame_range=None):
     bpy.context.scene.render.fps = animation.header.frame_rate
     bpy.context.scene.frame_start = 0
     bpy.context.scene.frame_end = animation.header.num_frames - 1
 
+    if frame_range is not None:
+        bpy.context.scene.frame_start = frame_range[0]
+        bpy.context.scene.frame_end = frame_range[1]
+
+
+def keys_in_range(keys, frame_range):
+    if frame_range is None:
+        return keys
+    return keys_in_window(keys, frame_range[0], frame_range[1])
+
+
+def frames_in_range(first_frame, last_frame, frame_range):
+    if frame_range is None:
+        return first_frame, last_frame
+
+    start = min(max(frame_range[0], first_frame), last_frame)
+    end = max(min(frame_range[1], last_frame), start)
+    return start, end
+
+
+def get_fcurve(bone, data_path, index=0):
+    owner = bone.id_data
+    path = bone.path_from_id(data_path)
+    group = '' if bone == owner else bone.name
+
+    if owner.animation_data is None:
+        owner.animation_data_create()
+    action = owner.animation_data.action
+    if action is None:
+        action = bpy.data.actions.new(owner.name + 'Action')
+        owner.animation_data.action = action
+
+    if bpy.app.version >= (4, 4, 0):
+        return action.fcurve_ensure_for_datablock(owner, path, index=index, group_name=group)
+
+    fcurve = action.fcurves.find(path, index=index)
+    if fcurve is None:
+        fcurve = action.fcurves.new(path, index=index, action_group=group)
+    return fcurve
+
+
+interpolation_modes = {'CONSTANT': 0, 'LINEAR': 1, 'BEZIER': 2}
 
-creation_options = {'INSERTKEY_NEEDED'}
 
+def needed_keys(values):
+    # drop the keys inside of runs of equal values, the curve stays the same without them
+    values = np.asarray(values, dtype=np.float32)
+    keep = np.ones(len(values), dtype=bool)
+    if len(values) > 2:
+        changed = values[1:] != values[:-1]
+        keep[1:-1] = changed[:-1] | changed[1:]
+    return keep
 
-def set_translation(bone, index, frame, value):
-    bone.location[index] = value
-    bone.keyframe_insert(data_path='location', index=index, frame=frame, options=creation_options)
 
+def insert_keys(bone, data_path, index, frames, values, interpolation='BEZIER'):
+    if len(frames) == 0:
+        return
+
+    fcurve = get_fcurve(bone, data_path, index)
+    points = fcurve.keyframe_points
+
+    existing = np.empty(len(points) * 2, dtype=np.float32)
+    points.foreach_get('co', existing)
+    keys = np.concatenate((np.column_stack((frames, values)), existing.reshape(-1, 2)))
+
+    # new keys replace existing ones on the same frame
+    _, first = np.unique(keys[:, 0], return_index=True)
+    keys = keys[first]
+
+    points.add(len(keys) - len(points))
+    points.foreach_set('co', keys.ravel())
+    points.foreach_set('interpolation', [interpolation_modes[interpolation]] * len(keys))
+    fcurve.update()
 
-def set_rotation(bone, frame, value):
-    bone.rotation_quaternion = value
-    bone.keyframe_insert(data_path='rotation_quaternion', frame=frame)
 
+def set_translation(bone, index, frames, values):
+    keep = needed_keys(values)
+    insert_keys(bone, 'location', index, frames[keep], values[keep])
 
-def set_visibility(bone, frame, value):
+
+def set_rotation(bone, frames, values):
+    for index in range(4):
+        insert_keys(bone, 'rotation_quaternion', index, frames, values[:, index])
+
+
+def set_visibility(bone, frames, values):
     if isinstance(bone, bpy.types.Bone):
-        bone.visibility = value
-        bone.keyframe_insert(data_path='visibility', frame=frame, options=creation_options)
+        data_path = 'visibility'
     else:
-        bone.hide_viewport = bool(value)
-        bone.keyframe_insert(data_path='hide_viewport', frame=frame, options=creation_options)
+        data_path = 'hide_viewport'
+        values = values.astype(bool)
+
+    keep = needed_keys(values)
+    insert_keys(bone, data_path, 0, frames[keep], values[keep].astype(np.float64), 'CONSTANT')
 
 
-def set_keyframe(bone, channel, frame, value):
+def set_keyframes(bone, channel, frames, values):
+    frames = np.asarray(frames, dtype=np.float64)
+    values = continuous_values(channel, np.asarray(values, dtype=np.float64))
+
     if is_visibility(channel):
-        set_visibility(bone, frame, value)
+        set_visibility(bone, frames, values)
     elif is_translation(channel):
-        set_translation(bone, channel.type, frame, value)
+        set_translation(bone, channel.type, frames, values)
     else:
-        set_rotation(bone, frame, value)
+        set_rotation(bone, frames, values.reshape(-1, 4))
+
+
+def continuous_values(channel, values):
+    if channel.type != CHANNEL_Q:
+        return values
+    return continuous_quaternions(values)
+
+
+def apply_keys(bone, channel, keys):
+    set_keyframes(bone, channel, [key.time_code for key in keys], [key.value for key in keys])
+
+
+def apply_timecoded(bone, channel, frame_range=None):
+    apply_keys(bone, channel, keys_in_range(channel.time_codes, frame_range))
+
+
+def apply_time_coded_bit(bone, channel, frame_range=None):
+    keys = keys_in_range(channel.time_codes, frame_range)
+    start = 0 if frame_range is None else frame_range[0]
+    frames = [key.time_code for key in keys]
+    values = [key.value for key in keys]
+    if not keys or keys[0].time_code > start:
+        frames.insert(0, start)
+        values.insert(0, bool(channel.default_value))
+    set_keyframes(bone, channel, frames, values)
 
 
-def apply_timecoded(bone, channel):
-    for key in channel.time_codes:
-        set_keyframe(bone, channel, key.time_code, key.value)
+def apply_motion_channel_time_coded(bone, channel, frame_range=None):
+    apply_keys(bone, channel, keys_in_range(channel.data, frame_range))
 
 
-def apply_motion_channel_time_coded(bone, channel):
-    for datum in channel.data:
-        set_keyframe(bone, channel, datum.time_code, datum.value)
+def apply_adaptive_delta_data(bone, channel, scale, data, frame_range):
+    first_frame, last_frame = frames_in_range(0, channel.num_time_codes - 1, frame_range)
+    values = decode(channel.type, channel.vector_len, channel.num_time_codes, scale, data, first_frame, last_frame)
+    set_keyframes(bone, channel, np.arange(first_frame, first_frame + len(values)), values)
 
 
-def apply_motion_channel_adaptive_delta(bone, channel):
-    data = decode(channel.type, channel.vector_len, channel.num_time_codes, channel.data.scale, channel.data.data)
-    for i in range(channel.num_time_codes):
-        set_keyframe(bone, channel, i, data[i])
+def apply_motion_channel_adaptive_delta(bone, channel, frame_range=None):
+    apply_adaptive_delta_data(bone, channel, channel.data.scale, channel.data.data, frame_range)
 
 
-def apply_adaptive_delta(bone, channel):
-    data = decode(channel.type, channel.vector_len, channel.num_time_codes, channel.scale, channel.data)
-    for i in range(channel.num_time_codes):
-        set_keyframe(bone, channel, i, data[i])
+def apply_adaptive_delta(bone, channel, frame_range=None):
+    apply_adaptive_delta_data(bone, channel, channel.scale, channel.data, frame_range)
 
 
-def apply_uncompressed(bone, channel):
-    for index in range(channel.last_frame - channel.first_frame + 1):
-        data = channel.data[index]
-        frame = index + channel.first_frame
-        set_keyframe(bone, channel, frame, data)
+def apply_uncompressed(bone, channel, frame_range=None):
+    first_frame, last_frame = frames_in_range(channel.first_frame, channel.last_frame, frame_range)
+    data = channel.data[first_frame - channel.first_frame:last_frame + 1 - channel.first_frame]
+    set_keyframes(bone, channel, np.arange(first_frame, first_frame + len(data)), data)
 
 
-def process_channels(context, hierarchy, channels, rig, apply_func):
+def process_channels(bone_lookup, channels, apply_func, frame_range=None):
     for channel in channels:
-        obj = get_bone(context, rig, hierarchy, channel)
+        obj = get_bone(bone_lookup, channel)
         if obj is None:
             continue
 
-        apply_func(obj, channel)
+        apply_func(obj, channel, frame_range)
 
 
-def process_motion_channels(context, hierarchy, channels, rig):
+def process_motion_channels(bone_lookup, channels, frame_range=None):
     for channel in channels:
-        obj = get_bone(context, rig, hierarchy, channel)
+        obj = get_bone(bone_lookup, channel)
         if obj is None:
             continue
 
         if channel.delta_type == 0:
-            apply_motion_channel_time_coded(obj, channel)
+            apply_motion_channel_time_coded(obj, channel, frame_range)
         else:
-            apply_motion_channel_adaptive_delta(obj, channel)
+            apply_motion_channel_adaptive_delta(obj, channel, frame_range)
 
 
-def create_animation(context, rig, animation, hierarchy):
+def create_animation(context, rig, animation, hierarchy, frame_range=None, frame_rate=None):
     if animation is None:
         return
 
-    setup_animation(animation)
+    animation = resample_animation(context, animation, frame_rate, frame_range)
+    setup_animation(animation, frame_range)
 
+    bone_lookup = create_bone_lookup(rig, hierarchy)
     if isinstance(animation, CompressedAnimation):
-        process_channels(context, hierarchy, animation.time_coded_channels, rig, apply_timecoded)
-        process_channels(context, hierarchy, animation.adaptive_delta_channels, rig, apply_adaptive_delta)
-        process_motion_channels(context, hierarchy, animation.motion_channels, rig)
+        validate_channels(context, hierarchy, animation.time_coded_channels + animation.adaptive_delta_channels +
+                          animation.time_coded_bit_channels + animation.motion_channels, bone_lookup)
+        process_channels(bone_lookup, animation.time_coded_channels, apply_timecoded, frame_range)
+        process_channels(bone_lookup, animation.adaptive_delta_channels, apply_adaptive_delta, frame_range)
+        process_channels(bone_lookup, animation.time_coded_bit_channels, apply_time_coded_bit, frame_range)
+        process_motion_channels(bone_lookup, animation.motion_channels, frame_range)
     else:
-        process_channels(context, hierarchy, animation.channels, rig, apply_uncompressed)
+        validate_channels(context, hierarchy, animation.channels, bone_lookup)
+        process_channels(bone_lookup, animation.channels, apply_uncompressed, frame_range)
 
     if rig is not None and rig.animation_data is not None and rig.animation_data.action is not None:
         rig.animation_data.action.name = animation.header.name
     elif rig is not None and rig.data is not None and rig.data.animation_data is not None and rig.data.animation_data.action is not None:
         rig.data.animation_data.action.name = animation.header.name
 
-    bpy.context.scene.frame_set(0)
+    bpy.context.scene.frame_set(bpy.context.scene.frame_start)
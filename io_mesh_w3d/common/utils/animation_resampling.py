@@ -0,0 +1,123 @@
+# <pep8 compliant>
+# Written by Stephan Vedder and Michael Schnabel
+
+import math
+import numpy as np
+from mathutils import Quaternion
+from io_mesh_w3d.common.structs.animation import *
+from io_mesh_w3d.w3d.structs.compressed_animation import *
+from io_mesh_w3d.common.utils.pose_evaluation import channel_keys, sample_keys
+
+
+def is_visibility(channel):
+    return isinstance(channel, (AnimationBitChannel, TimeCodedBitChannel)) or channel.type == CHANNEL_VIS
+
+
+def resampled_range(channel, times, ratio, num_frames, frame_range=None):
+    # compressed channels hold their values up to the end of the animation
+    first, last = 0, num_frames - 1
+    if isinstance(channel, (AnimationChannel, AnimationBitChannel)):
+        first = int(math.ceil(times[0] * ratio - 1e-6))
+        last = min(max(first, int(math.floor(times[-1] * ratio + 1e-6))), num_frames - 1)
+
+    if frame_range is None:
+        return first, last
+    return frame_window(first, last, frame_range[0], frame_range[1])
+
+
+def visibility_keys(channel):
+    if isinstance(channel, AnimationBitChannel):
+        return channel.first_frame + np.arange(len(channel.data)), np.asarray(channel.data, dtype=np.float64)
+
+    if isinstance(channel, TimeCodedBitChannel):
+        times = [0] + [key.time_code for key in channel.time_codes]
+        values = [float(channel.default_value)] + [float(key.value) for key in channel.time_codes]
+        return np.array(times, dtype=np.float64), np.array(values)
+    return channel_keys(channel)
+
+
+def resample_visibility_channel(channel, ratio, num_frames, frame_range=None):
+    times, values = visibility_keys(channel)
+    first, last = resampled_range(channel, times, ratio, num_frames, frame_range)
+
+    # visibility toggles instead of fading, so every frame takes the last key before it
+    frames = np.arange(first, last + 1) / ratio
+    index = np.clip(np.searchsorted(times, frames + 1e-6, side='right') - 1, 0, len(times) - 1)
+    data = values[index] >= VISIBILITY_THRESHOLD
+
+    if isinstance(channel, AnimationChannel):
+        return AnimationChannel(first_frame=first, last_frame=last, vector_len=1, type=channel.type,
+                                pivot=channel.pivot, data=data.astype(np.float64).tolist())
+    return AnimationBitChannel(first_frame=first, last_frame=last, type=0, pivot=channel.pivot,
+                               data=data.tolist())
+
+
+def resample_channels(channels, ratio, num_frames, frame_range=None):
+    # channels with identical keys are interpolated together in a single call
+    groups = {}
+    for channel in channels:
+        times, values = channel_keys(channel)
+        if len(times) == 0:
+            continue
+        times = np.asarray(times, dtype=np.float64)
+        key = (channel.type == CHANNEL_Q, isinstance(channel, AnimationChannel), times.tobytes())
+        groups.setdefault(key, (times, [], []))
+        groups[key][1].append(channel)
+        groups[key][2].append(values)
+
+    result = []
+    for (quaternion, _, _), (times, group, values) in groups.items():
+        first, last = resampled_range(group[0], times, ratio, num_frames, frame_range)
+        frames = np.arange(first, last + 1) / ratio
+        samples = sample_keys(times, np.stack(values, axis=1), frames, quaternion)
+
+        for i, channel in enumerate(group):
+            if quaternion:
+                data = [Quaternion(value) for value in samples[:, i].tolist()]
+            else:
+                data = samples[:, i].tolist()
+
+            result.append(AnimationChannel(first_frame=first, last_frame=last, vector_len=channel.vector_len,
+                                           type=channel.type, pivot=channel.pivot, data=data))
+    return result
+
+
+def resample_animation(context, animation, frame_rate, frame_range=None):
+    # frame_range limits the result to [first, last] frames at the new frame rate
+    if animation is None:
+        return animation
+
+    if not frame_rate or animation.header.frame_rate in [0, frame_rate]:
+        if frame_range is None:
+            return animation
+        return animation.crop(frame_range[0], frame_range[1])
+
+    header = animation.header
+    ratio = frame_rate / header.frame_rate
+    num_frames = int(round((header.num_frames - 1) * ratio)) + 1
+
+    if frame_range is not None:
+        # only the source frames around the range are needed
+        animation = animation.crop(int(math.floor(frame_range[0] / ratio)), int(math.ceil(frame_range[1] / ratio)))
+
+    if isinstance(animation, CompressedAnimation):
+        channels = animation.time_coded_channels + animation.adaptive_delta_channels + \
+            animation.time_coded_bit_channels + animation.motion_channels
+    else:
+        channels = animation.channels
+
+    result = Animation(
+        header=AnimationHeader(
+            name=header.name,
+            hierarchy_name=header.hierarchy_name,
+            num_frames=num_frames,
+            frame_rate=frame_rate))
+
+    result.channels = resample_channels(
+        [channel for channel in channels if not is_visibility(channel)], ratio, num_frames, frame_range)
+    result.channels += [resample_visibility_channel(channel, ratio, num_frames, frame_range)
+                        for channel in channels if is_visibility(channel)]
+
+    context.info(f'resampled animation \'{header.name}\' from {header.frame_rate} to {frame_rate} fps: '
+                 f'{header.num_frames} -> {num_frames} frames')
+    return result
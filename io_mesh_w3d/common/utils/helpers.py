@@ -4,6 +4,7 @@
 import bpy
 import os
 import sys
+import numpy as np
 from mathutils import Quaternion, Matrix, Vector
 from bpy_extras.image_utils import load_image
 
@@ -66,7 +67,14 @@ def rig_object(obj, hierarchy, rig, sub_object):
     obj.parent_type = 'BONE'
 
 
-def create_uvlayer(context, mesh, b_mesh, tris, mat_pass):
+def set_uvs(uv_layer, tris, tx_coords):
+    # every triangle has its own three loops, so the loops map to the triangle vertices in order
+    vertex_ids = np.asarray(tris, dtype=np.int32).ravel()
+    uvs = np.array(tx_coords, dtype=np.float32).reshape(len(tx_coords), -1)[:, :2]
+    uv_layer.data.foreach_set('uv', uvs[vertex_ids].ravel())
+
+
+def create_uvlayer(context, mesh, tris, mat_pass):
     tx_coords = None
     if mat_pass.tx_coords:
         tx_coords = mat_pass.tx_coords
@@ -87,13 +95,10 @@ def create_uvlayer(context, mesh, b_mesh, tris, mat_pass):
         return
 
     uv_layer = mesh.uv_layers.new(do_init=False)
-    for i, face in enumerate(b_mesh.faces):
-        for loop in face.loops:
-            idx = tris[i][loop.index % 3]
-            uv_layer.data[loop.index].uv = tx_coords[idx].xy
+    set_uvs(uv_layer, tris, tx_coords)
 
 
-def create_uvlayer_2(context, mesh, b_mesh, tris, mat_pass):
+def create_uvlayer_2(context, mesh, tris, mat_pass):
     tx_coords_2 = None
     if mat_pass.tx_coords_2:
         tx_coords_2 = mat_pass.tx_coords_2
@@ -102,14 +107,24 @@ def create_uvlayer_2(context, mesh, b_mesh, tris, mat_pass):
         return
 
     uv_layer = mesh.uv_layers.new(do_init=False)
-    for i, face in enumerate(b_mesh.faces):
-        for loop in face.loops:
-            idx = tris[i][loop.index % 3]
-            uv_layer.data[loop.index].uv = tx_coords_2[idx].xy
+    set_uvs(uv_layer, tris, tx_coords_2)
 
 
 extensions = ['.dds', '.tga', '.jpg', '.jpeg', '.png', '.bmp']
 
+# (directory, file, name) -> name of the loaded image or of the placeholder for a missing texture
+texture_cache = {}
+
+placeholder_size = 64
+
+
+def create_placeholder_image(name):
+    img = bpy.data.images.new(name, width=placeholder_size, height=placeholder_size)
+    img.generated_type = 'COLOR_GRID'
+    img.source = 'GENERATED'
+    img.name = name + extensions[0]
+    return img
+
 
 def find_texture(context, file, name=None):
     file = file.rsplit('.', 1)[0]
@@ -123,7 +138,12 @@ def find_texture(context, file, name=None):
         if combined in bpy.data.images:
             return bpy.data.images[combined]
 
-    path = insensitive_path(os.path.dirname(context.filepath))
+    directory = os.path.dirname(context.filepath)
+    key = (directory, file, name)
+    if key in texture_cache and texture_cache[key] in bpy.data.images:
+        return bpy.data.images[texture_cache[key]]
+
+    path = insensitive_path(directory)
     filepath = path + os.path.sep + file
 
     img = None
@@ -137,15 +157,18 @@ def find_texture(context, file, name=None):
     if img is None:
         context.warning(
             f'texture not found: {filepath} {extensions}. Make sure it is right next to the file you are importing!')
-        img = bpy.data.images.new(name, width=2048, height=2048)
-        img.generated_type = 'COLOR_GRID'
-        img.source = 'GENERATED'
-        img.name = name + extensions[0]
+        # the image name is exported as texture name, so every missing texture needs its own placeholder
+        img = create_placeholder_image(name)
 
     img.alpha_mode = 'STRAIGHT'
+    texture_cache[key] = img.name
     return img
 
 
+# blender 4.x has no face maps anymore, the face map of every face is stored in this integer attribute
+face_map_attribute = 'face_map_index'
+
+
 def get_aa_box(vertices):
     minX = sys.float_info.max
     maxX = sys.float_info.min
@@ -2,82 +2,121 @@
 # Written by Stephan Vedder and Michael Schnabel
 
 import bpy
-import bmesh
+import hashlib
+import os
+import numpy as np
 from bpy_extras import node_shader_utils
 
 from io_mesh_w3d.common.utils.helpers import *
 from io_mesh_w3d.w3d.structs.mesh_structs.vertex_material import *
 
 
+##########################################################################
+# material cache
+##########################################################################
+
+# content key -> material name, identical materials of different meshes and files share one material
+material_cache = {}
+
+
+def struct_content(value):
+    if isinstance(value, (list, tuple)):
+        return [struct_content(item) for item in value]
+    if hasattr(value, '__dict__'):
+        return [type(value).__name__] + [(key, struct_content(item)) for key, item in sorted(vars(value).items())]
+    return value
+
+
+def material_content_key(context, *values):
+    # textures are searched next to the imported file, so the same names might refer to different images
+    content = [os.path.dirname(context.filepath), struct_content(values)]
+    return hashlib.sha1(repr(content).encode('utf-8')).hexdigest()
+
+
+def get_cached_material(key):
+    if key not in material_cache or material_cache[key] not in bpy.data.materials:
+        return None, None
+    material = bpy.data.materials[material_cache[key]]
+    return material, node_shader_utils.PrincipledBSDFWrapper(material, is_readonly=False)
+
+
 ##########################################################################
 # vertex material
 ##########################################################################
 
-def create_vertex_material(context, principleds, structure, mesh, b_mesh, name, triangles, mesh_ob):
+def create_texture_node(context, material, texture):
+    tex = find_texture(context, texture.file, texture.id)
+    node_tree = material.node_tree
+    bsdf_node = node_tree.nodes.get('Principled BSDF')
+    texture_node = node_tree.nodes.new('ShaderNodeTexImage')
+    texture_node.image = tex
+    texture_node.location = (-350, 300)
+    links = node_tree.links
+    links.new(texture_node.outputs['Color'], bsdf_node.inputs['Base Color'])
+    links.new(texture_node.outputs['Alpha'], bsdf_node.inputs['Alpha'])
+
+
+def get_vertex_material(context, name, vert_mat, textures, shaders):
+    key = material_content_key(context, vert_mat, textures, shaders)
+    material, principled = get_cached_material(key)
+    if material is not None:
+        return material, principled
+
+    material, principled = create_material_from_vertex_material(name, vert_mat)
+    for texture in textures:
+        create_texture_node(context, material, texture)
+    for shader in shaders:
+        set_shader_properties(material, shader)
+
+    # set the blend mode to Alpha Clip for transparency
+    material.blend_method = 'CLIP'
+    material_cache[key] = material.name
+    return material, principled
+
 
-    if len(structure.material_passes) == 1 and len(
-            structure.textures) > 1:  # condition for multiple materials per single mesh object
+def create_vertex_material(context, principleds, structure, mesh, name, triangles):
+    multiple_materials = len(structure.material_passes) == 1 and len(structure.textures) > 1
+    num_materials = len(structure.textures) if multiple_materials else len(structure.vert_materials)
+
+    # all materials get their textures and shaders before they are looked up in the cache
+    textures = [[] for _ in range(num_materials)]
+    shaders = [[] for _ in range(num_materials)]
+    for i, shader in enumerate(structure.shaders):
+        if num_materials > 0:
+            shaders[min(i, num_materials - 1)].append(shader)
+
+    if multiple_materials:  # condition for multiple materials per single mesh object
         # Create the same amount of materials as textures used for this mesh
         source_mat = structure.vert_materials[0]
-        for texture in structure.textures:
+        for tex_id, texture in enumerate(structure.textures):
             source_mat.vm_name = texture.id
-            (material, principled) = create_material_from_vertex_material(name, source_mat)
+            textures[tex_id].append(texture)
+            (material, principled) = get_vertex_material(context, name, source_mat, textures[tex_id], shaders[tex_id])
             mesh.materials.append(material)
             principleds.append(principled)
 
-        create_uvlayer(context, mesh, b_mesh, triangles, structure.material_passes[0])
-
-        # Load textures
-        for tex_id, texture in enumerate(structure.textures):
-            texture = structure.textures[tex_id]
-            tex = find_texture(context, texture.file, texture.id)
-            node_tree = mesh.materials[tex_id].node_tree
-            bsdf_node = node_tree.nodes.get('Principled BSDF')
-            texture_node = node_tree.nodes.new('ShaderNodeTexImage')
-            texture_node.image = tex
-            texture_node.location = (-350, 300)
-            links = node_tree.links
-            links.new(texture_node.outputs['Color'], bsdf_node.inputs['Base Color'])
-            links.new(texture_node.outputs['Alpha'], bsdf_node.inputs['Alpha'])
+        create_uvlayer(context, mesh, triangles, structure.material_passes[0])
 
         # Assign material to appropriate object faces
-        bpy.ops.object.mode_set(mode='EDIT')
-        bm = bmesh.from_edit_mesh(mesh_ob.data)
-        bm.faces.ensure_lookup_table()
-        for i, face in enumerate(bm.faces):
-            if(i < len(structure.material_passes[0].tx_stages[0].tx_ids[0])):
-                bm.faces[i].material_index = structure.material_passes[0].tx_stages[0].tx_ids[0][i]
-            else:
-                bm.faces[i].material_index = structure.material_passes[0].tx_stages[0].tx_ids[0][0]
-        bpy.ops.object.mode_set(mode='OBJECT')
+        tx_ids = structure.material_passes[0].tx_stages[0].tx_ids[0]
+        material_indices = np.full(len(mesh.polygons), tx_ids[0], dtype=np.int32)
+        count = min(len(tx_ids), len(material_indices))
+        material_indices[:count] = tx_ids[:count]
+        mesh.polygons.foreach_set('material_index', material_indices)
     else:
-        for vertMat in structure.vert_materials:
-            (material, principled) = create_material_from_vertex_material(name, vertMat)
+        for mat_pass in structure.material_passes:
+            if mat_pass.tx_stages:
+                tex_id = mat_pass.tx_stages[0].tx_ids[0][0]
+                if tex_id < num_materials:
+                    textures[tex_id].append(structure.textures[tex_id])
+
+        for i, vertMat in enumerate(structure.vert_materials):
+            (material, principled) = get_vertex_material(context, name, vertMat, textures[i], shaders[i])
             mesh.materials.append(material)
             principleds.append(principled)
 
         for mat_pass in structure.material_passes:
-            create_uvlayer(context, mesh, b_mesh, triangles, mat_pass)
-
-            if mat_pass.tx_stages:
-                tx_stage = mat_pass.tx_stages[0]
-                mat_id = mat_pass.vertex_material_ids[0]
-                tex_id = tx_stage.tx_ids[0][0]
-                texture = structure.textures[tex_id]
-                tex = find_texture(context, texture.file, texture.id)
-                node_tree = mesh.materials[tex_id].node_tree
-                bsdf_node = node_tree.nodes.get('Principled BSDF')
-                texture_node = node_tree.nodes.new('ShaderNodeTexImage')
-                texture_node.image = tex
-                texture_node.location = (-350, 300)
-                links = node_tree.links
-                links.new(texture_node.outputs['Color'], bsdf_node.inputs['Base Color'])
-                links.new(texture_node.outputs['Alpha'], bsdf_node.inputs['Alpha'])
-
-    # Iterate through all materials and set their blend mode to Alpha Clip for transparency
-    for material in mesh.materials:
-        if material:
-            material.blend_method = 'CLIP'
+            create_uvlayer(context, mesh, triangles, mat_pass)
 
 
 def create_material_from_vertex_material(name, vert_mat):
@@ -127,6 +166,17 @@ def create_material_from_vertex_material(name, vert_mat):
 # shader material
 ##########################################################################
 
+def get_shader_material(context, name, shader_mat):
+    key = material_content_key(context, shader_mat)
+    material, principled = get_cached_material(key)
+    if material is not None:
+        return material, principled
+
+    material, principled = create_material_from_shader_material(context, name, shader_mat)
+    material_cache[key] = material.name
+    return material, principled
+
+
 def create_material_from_shader_material(context, name, shader_mat):
     name = name + '.' + shader_mat.header.type_name
     if name in bpy.data.materials:
@@ -3,6 +3,7 @@
 
 import bpy
 import bmesh
+import numpy as np
 from mathutils import Vector, Matrix
 from bpy_extras import node_shader_utils
 
@@ -198,6 +199,12 @@ def retrieve_meshes(context, hierarchy, rig, container_name, force_vertex_materi
                 for map in mesh.face_maps:
                     for i, val in enumerate(map.data):
                         mesh_struct.triangles[i].set_surface_type(face_map_names[val.value])
+            elif face_map_attribute in mesh.attributes and face_map_names:
+                face_map_indices = np.zeros(len(mesh.polygons), dtype=np.int32)
+                mesh.attributes[face_map_attribute].data.foreach_get('value', face_map_indices)
+                for i, index in enumerate(face_map_indices[:len(mesh_struct.triangles)].tolist()):
+                    if 0 <= index < len(face_map_names):
+                        mesh_struct.triangles[i].set_surface_type(face_map_names[index])
             else:
                 for map in mesh.face_maps:
                     for val in map.value:
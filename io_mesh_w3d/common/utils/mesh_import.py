@@ -2,19 +2,27 @@
 # Written by Stephan Vedder and Michael Schnabel
 
 import bpy
-import bmesh
+import numpy as np
 from io_mesh_w3d.common.utils.material_import import *
 
 
 def create_mesh(context, mesh_struct, coll):
     context.info(f'creating mesh \'{mesh_struct.name()}\'')
 
-    triangles = []
-    for triangle in mesh_struct.triangles:
-        triangles.append(tuple(triangle.vert_ids))
+    vertices = np.array(mesh_struct.verts, dtype=np.float32).reshape(-1, 3)
+    triangles = np.array([triangle.vert_ids for triangle in mesh_struct.triangles], dtype=np.int32).reshape(-1, 3)
 
     mesh = bpy.data.meshes.new(mesh_struct.name())
-    mesh.from_pydata(mesh_struct.verts, [], triangles)
+    mesh.vertices.add(len(vertices))
+    mesh.loops.add(triangles.size)
+    mesh.polygons.add(len(triangles))
+
+    mesh.vertices.foreach_set('co', vertices.ravel())
+    mesh.loops.foreach_set('vertex_index', triangles.ravel())
+    mesh.polygons.foreach_set('loop_start', np.arange(0, triangles.size, 3, dtype=np.int32))
+    if bpy.app.version < (4, 0, 0):
+        mesh.polygons.foreach_set('loop_total', np.full(len(triangles), 3, dtype=np.int32))
+    mesh.update(calc_edges=True)
 
     # fix repeated opeing bug: blender will rename the new mesh with .001, .002 suffix
     # we need to save the actual name of the mesh!
@@ -22,7 +30,7 @@ def create_mesh(context, mesh_struct, coll):
     if actual_mesh_name != mesh_struct.name():
         context.warning("Mesh name automatically fixed due to duplication, new name: " + actual_mesh_name)
 
-    mesh.normals_split_custom_set_from_vertices(mesh_struct.normals)
+    mesh.normals_split_custom_set_from_vertices(np.array(mesh_struct.normals, dtype=np.float32).reshape(-1, 3))
     if bpy.app.version < (4, 2, 0):
         mesh.use_auto_smooth = True
 
@@ -55,58 +63,37 @@ def create_mesh(context, mesh_struct, coll):
         constraint.track_axis = 'TRACK_X'
 
     if context.file_format == 'W3D':
-        for i, triangle in enumerate(mesh_struct.triangles):
-            surface_type_name = triangle.get_surface_type_name(context, i)
-            if bpy.app.version < (4, 0, 0):
-                if surface_type_name not in mesh_ob.face_maps:
-                    mesh_ob.face_maps.new(name=surface_type_name)
-            else:
-                if surface_type_name not in mesh.face_maps:
-                    face_map = mesh.face_maps.add()
-                    face_map.name = surface_type_name
-
-            if bpy.app.version < (4, 0, 0):
-                mesh_ob.face_maps[surface_type_name].add([i])
-            else:
-                val = mesh.face_maps[surface_type_name].value.add()
-                val.value = i
+        create_face_maps(context, mesh_struct, mesh, mesh_ob)
 
+    vertex_ids = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('vertex_index', vertex_ids)
     for i, mat_pass in enumerate(mesh_struct.material_passes):
-        create_vertex_color_layer(mesh, mat_pass.dcg, 'DCG', i)
-        create_vertex_color_layer(mesh, mat_pass.dig, 'DIG', i)
-        create_vertex_color_layer(mesh, mat_pass.scg, 'SCG', i)
+        create_vertex_color_layer(mesh, vertex_ids, mat_pass.dcg, 'DCG', i)
+        create_vertex_color_layer(mesh, vertex_ids, mat_pass.dig, 'DIG', i)
+        create_vertex_color_layer(mesh, vertex_ids, mat_pass.scg, 'SCG', i)
 
     principleds = []
 
     # vertex material stuff
-    b_mesh = bmesh.new()
-    b_mesh.from_mesh(mesh)
-
     if mesh_struct.vert_materials:
         create_vertex_material(
-            context, principleds, mesh_struct, mesh, b_mesh, actual_mesh_name, triangles, mesh_ob)
-
-        for i, shader in enumerate(mesh_struct.shaders):
-            set_shader_properties(mesh.materials[min(i, len(mesh.materials) - 1)], shader)
+            context, principleds, mesh_struct, mesh, actual_mesh_name, triangles)
 
     elif mesh_struct.prelit_vertex:
         create_vertex_material(context, principleds, mesh_struct.prelit_vertex,
-                               mesh, b_mesh, actual_mesh_name, triangles, mesh_ob)
-
-        for i, shader in enumerate(mesh_struct.prelit_vertex.shaders):
-            set_shader_properties(mesh.materials[i], shader)
+                               mesh, actual_mesh_name, triangles)
 
     # shader material stuff
     elif mesh_struct.shader_materials:
         for i, shaderMat in enumerate(mesh_struct.shader_materials):
-            material, principled = create_material_from_shader_material(
+            material, principled = get_shader_material(
                 context, actual_mesh_name, shaderMat)
             mesh.materials.append(material)
             principleds.append(principled)
 
         for mat_pass in mesh_struct.material_passes:
-            create_uvlayer(context, mesh, b_mesh, triangles, mat_pass)
-            create_uvlayer_2(context, mesh, b_mesh, triangles, mat_pass)
+            create_uvlayer(context, mesh, triangles, mat_pass)
+            create_uvlayer_2(context, mesh, triangles, mat_pass)
 
     mesh.update()
     if mesh.validate(verbose=True):
@@ -115,6 +102,52 @@ def create_mesh(context, mesh_struct, coll):
     return mesh.name
 
 
+def create_face_maps(context, mesh_struct, mesh, mesh_ob):
+    surface_types = np.array([triangle.surface_type for triangle in mesh_struct.triangles], dtype=np.int64)
+    _, first_indices = np.unique(surface_types, return_index=True)
+
+    # group the triangles by face map, in the order the face maps first occur
+    groups = {}
+    for index in np.sort(first_indices).tolist():
+        name = mesh_struct.triangles[index].get_surface_type_name(context, index)
+        indices = np.flatnonzero(surface_types == surface_types[index])
+        groups[name] = np.concatenate((groups[name], indices)) if name in groups else indices
+
+    face_map_indices = np.zeros(len(surface_types), dtype=np.int32)
+    for i, (name, indices) in enumerate(groups.items()):
+        if bpy.app.version < (4, 0, 0):
+            mesh_ob.face_maps.new(name=name).add(np.sort(indices).tolist())
+        else:
+            mesh.face_maps.add().name = name
+            face_map_indices[indices] = i
+
+    if bpy.app.version >= (4, 0, 0):
+        attribute = mesh.attributes.new(face_map_attribute, 'INT', 'FACE')
+        attribute.data.foreach_set('value', face_map_indices)
+
+
+def create_vertex_groups(mesh_ob, hierarchy, bone_ids, xtra_ids):
+    # create the groups in the order the bones are first referenced
+    used = np.column_stack((bone_ids, np.where(xtra_ids > 0, xtra_ids, -1))).ravel()
+    used = used[used >= 0]
+    _, first_indices = np.unique(used, return_index=True)
+
+    for bone_idx in used[np.sort(first_indices)].tolist():
+        name = hierarchy.pivots[bone_idx].name
+        if name not in mesh_ob.vertex_groups:
+            mesh_ob.vertex_groups.new(name=name)
+
+
+def add_vertex_group_weights(mesh_ob, hierarchy, indices, bone_ids, weights, mode):
+    # one add call per (bone, weight) bucket instead of one per vertex
+    buckets, inverse, counts = np.unique(
+        np.column_stack((bone_ids, weights)), axis=0, return_inverse=True, return_counts=True)
+    order = np.argsort(inverse.ravel(), kind='stable')
+
+    for (bone_idx, weight), bucket in zip(buckets.tolist(), np.split(indices[order], np.cumsum(counts)[:-1])):
+        mesh_ob.vertex_groups[hierarchy.pivots[int(bone_idx)].name].add(bucket.tolist(), weight, mode)
+
+
 def rig_mesh(mesh_struct, hierarchy, rig, sub_object=None):
     mesh_ob = bpy.data.objects[mesh_struct.name()]
 
@@ -123,34 +156,46 @@ def rig_mesh(mesh_struct, hierarchy, rig, sub_object=None):
 
     if mesh_struct.is_skin():
         mesh = bpy.data.meshes[mesh_ob.name]
-        normals = mesh_struct.normals.copy()
-        for i, vert_inf in enumerate(mesh_struct.vert_infs):
-            weight = vert_inf.bone_inf
-            xtra_weight = vert_inf.xtra_inf
-
-            if weight < 0.01 and xtra_weight < 0.01:
-                weight = 1.0
 
-            pivot = hierarchy.pivots[vert_inf.bone_idx]
-            if vert_inf.bone_idx == 0 and rig is not None:
+        vert_infs = mesh_struct.vert_infs
+        bone_ids = np.array([vert_inf.bone_idx for vert_inf in vert_infs], dtype=np.int64)
+        xtra_ids = np.array([vert_inf.xtra_idx for vert_inf in vert_infs], dtype=np.int64)
+        weights = np.array([vert_inf.bone_inf for vert_inf in vert_infs], dtype=np.float64)
+        xtra_weights = np.array([vert_inf.xtra_inf for vert_inf in vert_infs], dtype=np.float64)
+        weights[(weights < 0.01) & (xtra_weights < 0.01)] = 1.0
+
+        indices = np.arange(len(vert_infs))
+        has_xtra = xtra_ids > 0
+        create_vertex_groups(mesh_ob, hierarchy, bone_ids, xtra_ids)
+        add_vertex_group_weights(mesh_ob, hierarchy, indices, bone_ids, weights, 'REPLACE')
+        add_vertex_group_weights(
+            mesh_ob, hierarchy, indices[has_xtra], xtra_ids[has_xtra], xtra_weights[has_xtra], 'ADD')
+
+        # move the vertices from bone space into the bind pose, one matrix and rotation per used bone
+        used_ids, inverse = np.unique(bone_ids, return_inverse=True)
+        matrices = np.empty((len(used_ids), 4, 4))
+        rotations = np.empty((len(used_ids), 3, 3))
+        for i, bone_idx in enumerate(used_ids.tolist()):
+            if bone_idx == 0 and rig is not None:
                 matrix = rig.matrix_local
             else:
-                matrix = rig.data.bones[pivot.name].matrix_local
-
-            if pivot.name not in mesh_ob.vertex_groups:
-                mesh_ob.vertex_groups.new(name=pivot.name)
-            mesh_ob.vertex_groups[pivot.name].add([i], weight, 'REPLACE')
+                matrix = rig.data.bones[hierarchy.pivots[bone_idx].name].matrix_local
+            matrices[i] = np.array(matrix)
+            rotations[i] = np.array(matrix.decompose()[1].to_matrix())
 
-            if vert_inf.xtra_idx > 0:
-                xtra_pivot = hierarchy.pivots[vert_inf.xtra_idx]
-                if xtra_pivot.name not in mesh_ob.vertex_groups:
-                    mesh_ob.vertex_groups.new(name=xtra_pivot.name)
-                mesh_ob.vertex_groups[xtra_pivot.name].add([i], xtra_weight, 'ADD')
+        num_vertices = len(vert_infs)
+        positions = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get('co', positions)
+        positions = positions.reshape(-1, 3)
+        normals = np.array(mesh_struct.normals, dtype=np.float64).reshape(-1, 3)
 
-            mesh.vertices[i].co = matrix @ mesh_struct.verts[i]
+        verts = np.array(mesh_struct.verts[:num_vertices], dtype=np.float64).reshape(-1, 3)
+        vertex_matrices = matrices[inverse]
+        positions[:num_vertices] = np.einsum('nij,nj->ni', vertex_matrices[:, :3, :3], verts)
+        positions[:num_vertices] += vertex_matrices[:, :3, 3]
+        normals[:num_vertices] = np.einsum('nij,nj->ni', rotations[inverse], normals[:num_vertices])
 
-            _, rotation, _ = matrix.decompose()
-            normals[i] = rotation @ mesh_struct.normals[i]
+        mesh.vertices.foreach_set('co', positions.ravel())
 
         modifier = mesh_ob.modifiers.new(rig.name, 'ARMATURE')
         modifier.object = rig
@@ -166,10 +211,16 @@ def rig_mesh(mesh_struct, hierarchy, rig, sub_object=None):
         rig_object(mesh_ob, hierarchy, rig, sub_object)
 
 
-def create_vertex_color_layer(mesh, colors, name, index):
+def create_vertex_color_layer(mesh, vertex_ids, colors, name, index):
     if not colors:
         return
-    layer = mesh.vertex_colors.new(name=f'{name}_{index}')
 
-    for i, loop in enumerate(mesh.loops):
-        layer.data[i].color = colors[loop.vertex_index].to_vector_rgba()
+    colors = np.array([(color.r, color.g, color.b, color.a) for color in colors], dtype=np.float32) / 255.0
+    loop_colors = colors[vertex_ids].ravel()
+
+    if bpy.app.version < (3, 4, 0):
+        layer = mesh.vertex_colors.new(name=f'{name}_{index}')
+        layer.data.foreach_set('color', loop_colors)
+    else:
+        layer = mesh.color_attributes.new(f'{name}_{index}', 'BYTE_COLOR', 'CORNER')
+        layer.data.foreach_set('color_srgb', loop_colors)
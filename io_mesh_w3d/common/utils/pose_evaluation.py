@@ -0,0 +1,141 @@
+# <pep8 compliant>
+# Written by Stephan Vedder and Michael Schnabel
+
+import numpy as np
+from io_mesh_w3d.w3d.adaptive_delta import decode
+from io_mesh_w3d.common.structs.animation import *
+from io_mesh_w3d.w3d.structs.compressed_animation import *
+
+
+def quaternion_matrices(quaternions):
+    # wxyz quaternions (..., 4) -> rotation matrices (..., 3, 3)
+    quaternions = quaternions / np.linalg.norm(quaternions, axis=-1, keepdims=True)
+    w, x, y, z = np.moveaxis(quaternions, -1, 0)
+    return np.stack((
+        np.stack((1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)), axis=-1),
+        np.stack((2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)), axis=-1),
+        np.stack((2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)), axis=-1)), axis=-2)
+
+
+def transform_matrices(translations, rotations):
+    result = np.zeros(translations.shape[:-1] + (4, 4))
+    result[..., :3, :3] = quaternion_matrices(rotations)
+    result[..., :3, 3] = translations
+    result[..., 3, 3] = 1.0
+    return result
+
+
+def slerp_pairs(start, end, t):
+    dot = np.sum(start * end, axis=-1)
+    end = np.where(dot[..., None] < 0.0, -end, end)
+    theta = np.arccos(np.clip(np.abs(dot), 0.0, 1.0))
+    sin_theta = np.sin(theta)
+    small = sin_theta < 1e-6
+    sin_theta[small] = 1.0
+    start_weight = np.where(small, 1.0 - t, np.sin((1.0 - t) * theta) / sin_theta)
+    end_weight = np.where(small, t, np.sin(t * theta) / sin_theta)
+    result = start_weight[..., None] * start + end_weight[..., None] * end
+    return result / np.linalg.norm(result, axis=-1, keepdims=True)
+
+
+def sample_keys(times, values, frames, quaternion=False):
+    # linear interpolation (slerp for quaternions) between keys, held constant outside of them
+    # values may hold several channels sharing the same keys along their second axis
+    index = np.clip(np.searchsorted(times, frames, side='right') - 1, 0, len(times) - 1)
+    next_index = np.minimum(index + 1, len(times) - 1)
+    span = times[next_index] - times[index]
+    t = np.clip((frames - times[index]) / np.where(span > 0, span, 1), 0.0, 1.0)
+
+    if quaternion:
+        t = t.reshape(t.shape + (1,) * (values.ndim - 2))
+        return slerp_pairs(values[index], values[next_index], t)
+    t = t.reshape(t.shape + (1,) * (values.ndim - 1))
+    return values[index] + (values[next_index] - values[index]) * t
+
+
+def channel_keys(channel):
+    if isinstance(channel, AnimationChannel):
+        return channel.first_frame + np.arange(len(channel.data)), np.asarray(channel.data, dtype=np.float64)
+
+    if isinstance(channel, TimeCodedAnimationChannel) or \
+            (isinstance(channel, MotionChannel) and channel.delta_type == 0):
+        keys = channel.time_codes if isinstance(channel, TimeCodedAnimationChannel) else channel.data
+        times = np.array([key.time_code for key in keys], dtype=np.float64)
+        return times, np.asarray([key.value for key in keys], dtype=np.float64)
+
+    if isinstance(channel, MotionChannel):
+        scale, data = channel.data.scale, channel.data.data
+    else:
+        scale, data = channel.scale, channel.data
+    values = decode(channel.type, channel.vector_len, channel.num_time_codes, scale, data)
+    return np.arange(len(values)), values
+
+
+def animation_channels(animation):
+    if isinstance(animation, CompressedAnimation):
+        return animation.time_coded_channels + animation.adaptive_delta_channels + animation.motion_channels
+    return [channel for channel in animation.channels if isinstance(channel, AnimationChannel)]
+
+
+def sample_animation(animation, num_pivots, frames):
+    # translation offsets (frames, pivots, 3) and rotations (frames, pivots, 4) of the animation
+    translations = np.zeros((len(frames), num_pivots, 3))
+    rotations = np.zeros((len(frames), num_pivots, 4))
+    rotations[..., 0] = 1.0
+
+    for channel in animation_channels(animation):
+        if channel.pivot >= num_pivots or channel.type not in [CHANNEL_X, CHANNEL_Y, CHANNEL_Z, CHANNEL_Q]:
+            continue
+
+        times, values = channel_keys(channel)
+        if len(times) == 0:
+            continue
+
+        if channel.type == CHANNEL_Q:
+            rotations[:, channel.pivot] = sample_keys(times, values, frames, quaternion=True)
+        else:
+            translations[:, channel.pivot, channel.type] = sample_keys(times, values, frames)
+    return translations, rotations
+
+
+def pivot_depths(pivots):
+    depths = np.zeros(len(pivots), dtype=int)
+    for i, pivot in enumerate(pivots):
+        if pivot.parent_id >= i:
+            raise Exception(f'parent {pivot.parent_id} of pivot \'{pivot.name}\' ({i}) does not come before it')
+        if pivot.parent_id >= 0:
+            depths[i] = depths[pivot.parent_id] + 1
+    return depths
+
+
+def evaluate_pose(hierarchy, animation=None, frames=0):
+    """World space matrices of all pivots, (pivots, 4, 4) for a single frame and (frames, pivots, 4, 4) for many.
+
+    The pivot fixups (hierarchy.pivot_fixups, pivot.fixup_matrix) are deliberately not applied: the hierarchy
+    import ignores them as well, so the pose matches the imported rig and the exported animation.
+    """
+    single_frame = np.ndim(frames) == 0
+    frames = np.atleast_1d(np.asarray(frames, dtype=np.float64))
+
+    pivots = hierarchy.pivots
+    depths = pivot_depths(pivots)
+    parent_ids = np.array([pivot.parent_id for pivot in pivots], dtype=int)
+    base = transform_matrices(
+        np.array([list(pivot.translation) for pivot in pivots], dtype=np.float64).reshape(-1, 3),
+        np.array([list(pivot.rotation) for pivot in pivots], dtype=np.float64).reshape(-1, 4))
+
+    if animation is not None:
+        translations, rotations = sample_animation(animation, len(pivots), frames)
+        local = base @ transform_matrices(translations, rotations)
+    else:
+        local = np.repeat(base[None], len(frames), axis=0)
+
+    # pivots come after their parent, so every depth level can be resolved at once
+    world = local.copy()
+    for depth in range(1, depths.max(initial=0) + 1):
+        indices = np.flatnonzero(depths == depth)
+        world[:, indices] = world[:, parent_ids[indices]] @ local[:, indices]
+
+    if single_frame:
+        return world[0]
+    return world
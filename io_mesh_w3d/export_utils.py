@@ -9,6 +9,8 @@ from io_mesh_w3d.common.utils.animation_export import *
 from io_mesh_w3d.common.utils.hlod_export import *
 from io_mesh_w3d.common.utils.box_export import *
 from io_mesh_w3d.w3d.utils.dazzle_export import *
+from io_mesh_w3d.w3d.utils.animation_compression import *
+from io_mesh_w3d.common.utils.animation_resampling import resample_animation
 
 
 def save_data(context, export_settings):
@@ -84,8 +86,30 @@ def retrieve_data(context, export_settings):
                 return None
 
     if 'A' in export_mode:
-        timecoded = export_settings['compression'] == 'TC'
+        compression = export_settings['compression']
+        reduce_keyframes = compression == 'TC' and export_settings.get('reduce_keyframes', False)
+        frame_rate = export_settings.get('frame_rate', None)
+        timecoded = compression == 'TC' and not reduce_keyframes and not frame_rate
         data_context.animation = retrieve_animation(context, container_name, hierarchy, rig, timecoded)
+        data_context.animation = resample_animation(context, data_context.animation, frame_rate)
+        translation_tolerance = export_settings.get('translation_tolerance', TRANSLATION_TOLERANCE)
+        rotation_tolerance = export_settings.get('rotation_tolerance', ROTATION_TOLERANCE)
+        if export_settings.get('eliminate_channels', False):
+            eliminate_redundant_channels(context, data_context.animation, translation_tolerance, rotation_tolerance)
+        if reduce_keyframes:
+            data_context.animation = create_time_coded_animation(
+                context, data_context.animation, translation_tolerance, rotation_tolerance)
+        elif compression == 'TC' and not timecoded:
+            data_context.animation = create_time_coded_animation(context, data_context.animation, 0.0, 0.0)
+        elif compression == 'AD':
+            data_context.animation = create_adaptive_delta_animation(
+                context, data_context.animation, translation_tolerance, rotation_tolerance)
+        elif compression == 'MC':
+            data_context.animation = create_motion_channel_animation(
+                context, data_context.animation, translation_tolerance, rotation_tolerance)
+        elif compression == 'AUTO':
+            data_context.animation = create_auto_compressed_animation(
+                context, data_context.animation, translation_tolerance, rotation_tolerance)
         if not data_context.animation.validate(context):
             context.error('aborting export!')
             return None
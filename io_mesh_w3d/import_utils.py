@@ -10,12 +10,27 @@ from io_mesh_w3d.common.utils.box_import import *
 from io_mesh_w3d.w3d.utils.dazzle_import import *
 
 
+def structs_by_name(structs):
+    result = {}
+    for struct in structs:
+        result.setdefault(struct.name(), []).append(struct)
+    return result
+
+
 def create_data(context, meshes, hlod=None, hierarchy=None, boxes=None, animation=None, compressed_animation=None,
-                dazzles=None):
+                dazzles=None, frame_range=None, frame_rate=None, reuse_materials=False):
     boxes = boxes if boxes is not None else []
     dazzles = dazzles if dazzles is not None else []
     collection = get_collection(hlod)
 
+    if not reuse_materials:
+        material_cache.clear()
+
+    # keyed by the names in the files, creating the meshes might rename them
+    meshes_by_name = structs_by_name(meshes)
+    boxes_by_name = structs_by_name(boxes)
+    dazzles_by_name = structs_by_name(dazzles)
+
     mesh_names_map = {}
     if hlod is not None:
         current_coll = collection
@@ -25,39 +40,33 @@ def create_data(context, meshes, hlod=None, hierarchy=None, boxes=None, animatio
                 current_coll.hide_viewport = True
 
             for sub_object in lod_array.sub_objects:
-                for mesh in meshes:
-                    if mesh.name() == sub_object.name:
-                        newname = create_mesh(context, mesh, current_coll)
-                        mesh_names_map[mesh.name()] = newname
+                for mesh in meshes_by_name.get(sub_object.name, []):
+                    newname = create_mesh(context, mesh, current_coll)
+                    mesh_names_map[sub_object.name] = newname
 
-                for box in boxes:
-                    if box.name() == sub_object.name:
-                        create_box(box, collection)
+                for box in boxes_by_name.get(sub_object.name, []):
+                    create_box(box, collection)
 
-                for dazzle in dazzles:
-                    if dazzle.name() == sub_object.name:
-                        create_dazzle(context, dazzle, collection)
+                for dazzle in dazzles_by_name.get(sub_object.name, []):
+                    create_dazzle(context, dazzle, collection)
 
     rig = get_or_create_skeleton(hierarchy, collection)
 
     if hlod is not None:
         for lod_array in reversed(hlod.lod_arrays):
             for sub_object in lod_array.sub_objects:
-                for mesh in meshes:
-                    if mesh.name() == sub_object.name:
-                        mesh.header.mesh_name = mesh_names_map[mesh.name()]
-                        rig_mesh(mesh, hierarchy, rig, sub_object)
-                for box in boxes:
-                    if box.name() == sub_object.name:
-                        rig_box(box, hierarchy, rig, sub_object)
-                for dazzle in dazzles:
-                    if dazzle.name() == sub_object.name:
-                        dazzle_object = bpy.data.objects[dazzle.name()]
-                        rig_object(dazzle_object, hierarchy, rig, sub_object)
+                for mesh in meshes_by_name.get(sub_object.name, []):
+                    mesh.header.mesh_name = mesh_names_map[sub_object.name]
+                    rig_mesh(mesh, hierarchy, rig, sub_object)
+                for box in boxes_by_name.get(sub_object.name, []):
+                    rig_box(box, hierarchy, rig, sub_object)
+                for dazzle in dazzles_by_name.get(sub_object.name, []):
+                    dazzle_object = bpy.data.objects[dazzle.name()]
+                    rig_object(dazzle_object, hierarchy, rig, sub_object)
 
     else:
         for mesh in meshes:
             create_mesh(context, mesh, collection)
 
-    create_animation(context, rig, animation, hierarchy)
-    create_animation(context, rig, compressed_animation, hierarchy)
+    create_animation(context, rig, animation, hierarchy, frame_range, frame_rate)
+    create_animation(context, rig, compressed_animation, hierarchy, frame_range, frame_rate)
@@ -2,6 +2,9 @@
 # Written by Stephan Vedder and Michael Schnabel
 
 import math
+import numpy as np
+from mathutils import Quaternion
+from io_mesh_w3d.w3d.structs.compressed_animation import AdaptiveDeltaData, AdaptiveDeltaBlock
 
 
 def fill_with_exponents_of_10(table):
@@ -25,109 +28,205 @@ def calculate_table():
 DELTA_TABLE = calculate_table()
 
 
-def get_deltas(delta_bytes, num_bits):
-    deltas = [None] * 16
-
-    for i, byte in enumerate(delta_bytes):
-        if num_bits == 4:
-            index = i * 2
-            lower = byte & 0x0F
-            upper = byte >> 4
-            # Bitflip
-            if lower >= 8:
-                lower -= 16
-
-            deltas[index] = lower
-            deltas[index + 1] = upper
-        else:
-            # Bitflip
-            byte += 128
-            if byte >= 128:
-                byte -= 256
-            deltas[i] = byte
-    return deltas
+def calculate_nibble_table():
+    # maps each byte to its pair of signed 4 bit deltas (lower, upper)
+    signed = np.arange(256, dtype=np.uint8).view(np.int8)
+    lower = signed & 0x0F
+    # Bitflip
+    lower[lower >= 8] -= 16
+    upper = signed >> 4
+    return np.stack((lower, upper), axis=-1)
 
 
-def set_deltas(bytes, num_bits):
-    result = [None] * num_bits * 2
+def calculate_byte_table():
+    # maps each byte to its biased signed 8 bit delta
+    # Bitflip
+    return np.arange(256, dtype=np.uint8).view(np.int8) ^ np.int8(-128)
+
+
+def invert_table(table):
+    # maps the (delta + 8) or (delta + 128) values of a table back to its byte
+    offset = 8 if table.ndim == 2 else 128
+    inverse = np.zeros((16, 16) if table.ndim == 2 else 256, dtype=np.int8)
+    inverse[tuple((table.astype(np.int16) + offset).reshape(256, -1).T)] = np.arange(256, dtype=np.uint8).view(np.int8)
+    return inverse
 
+
+NIBBLE_TABLE = calculate_nibble_table()
+BYTE_TABLE = calculate_byte_table()
+NIBBLE_ENCODE_TABLE = invert_table(NIBBLE_TABLE)
+BYTE_ENCODE_TABLE = invert_table(BYTE_TABLE)
+
+
+def unpack_deltas(delta_bytes, num_bits):
+    indices = np.asarray(delta_bytes, dtype=np.int8).view(np.uint8)
     if num_bits == 4:
-        for i in range(int(len(bytes) / 2)):
-            lower = bytes[i * 2]
-            # Bitflip
-            if lower < 0:
-                lower += 16
-            upper = bytes[i * 2 + 1]
-            result[i] = (upper << 4) | lower
-    else:
-        for i in range(len(bytes)):
-            byte = bytes[i]
-            # Bitflip
-            byte -= 128
-            if byte < -127:
-                byte += 256
-            result[i] = byte
-    return result
+        deltas = np.take(NIBBLE_TABLE, indices, axis=0)
+        return deltas.reshape(indices.shape[:-1] + (-1,))
+    return np.take(BYTE_TABLE, indices)
 
 
-def decode(channel_type, vector_len, num_time_codes, scale, data):
-    scale_factor = 1.0
-    if data.bit_count == 8:
-        scale_factor /= 16.0
+def pack_deltas(deltas, num_bits):
+    deltas = np.asarray(deltas, dtype=np.int16)
+    if num_bits == 4:
+        pairs = deltas.reshape(deltas.shape[:-1] + (-1, 2)) + 8
+        return NIBBLE_ENCODE_TABLE[pairs[..., 0], pairs[..., 1]]
+    return np.take(BYTE_ENCODE_TABLE, deltas + 128)
 
-    result = [None] * num_time_codes
-    result[0] = data.initial_value
 
-    for i, delta_block in enumerate(data.delta_blocks):
-        delta_scale = scale * scale_factor * DELTA_TABLE[delta_block.block_index]
-        deltas = get_deltas(delta_block.delta_bytes, data.bit_count)
+def get_deltas(delta_bytes, num_bits):
+    return unpack_deltas(delta_bytes, num_bits).tolist()
 
-        for j, delta in enumerate(deltas):
-            idx = int(i / vector_len) * 16 + j + 1
-            if idx >= num_time_codes:
-                break
 
-            if channel_type == 6:
-                # shift from wxyz to xyzw
-                index = (delta_block.vector_index + 1) % 4
-                value = result[idx - 1][index] + delta_scale * delta
-                if result[idx] is None:
-                    result[idx] = result[idx - 1].copy()
-                result[idx][index] = value
-            else:
-                result[idx] = result[idx - 1] + delta_scale * delta
-    return result
+def set_deltas(bytes, num_bits):
+    return pack_deltas(bytes, num_bits).tolist()
 
 
-def encode(channel, num_bits):
+def block_steps(blocks, scale, bit_count):
     scale_factor = 1.0
-    if num_bits == 8:
+    if bit_count == 8:
         scale_factor /= 16.0
+    block_indices = np.array([block.block_index for block in blocks], dtype=np.intp)
+    return scale * scale_factor * np.array(DELTA_TABLE)[block_indices]
+
+
+def accumulate_float32(initial_value, deltas):
+    # quaternions are stored as 32 bit floats by mathutils, so every step of the sum is rounded to them
+    result = np.empty((len(deltas) + 1, initial_value.size))
+    result[0] = initial_value
+    for i, delta in enumerate(deltas):
+        result[i + 1] = np.float32(result[i] + delta)
+    return result
+
+
+def decode(channel_type, vector_len, num_time_codes, scale, data, first_frame=0, last_frame=None):
+    if last_frame is None or last_frame >= num_time_codes:
+        last_frame = num_time_codes - 1
+    first_frame = max(min(first_frame, last_frame), 0)
+
+    initial_value = np.array(data.initial_value, dtype=np.float64).reshape(-1)
+    if channel_type == 6:
+        initial_value = initial_value.astype(np.float32).astype(np.float64)
+
+    # every value depends on all deltas before it, so only the blocks after the window are skipped
+    num_blocks = len(data.delta_blocks) // vector_len
+    end_block = min((last_frame + 15) >> 4, num_blocks)
+    blocks = data.delta_blocks[:end_block * vector_len]
+
+    deltas = np.zeros((end_block, 16, initial_value.size))
+    if blocks:
+        delta_bytes = [block.delta_bytes for block in blocks]
+        block_deltas = block_steps(blocks, scale, data.bit_count)[:, None] * unpack_deltas(delta_bytes, data.bit_count)
+
+        # blocks are stored per 16 frames, each one holds the deltas of a single vector component
+        groups = np.arange(len(blocks)) // vector_len
+        components = np.zeros(len(blocks), dtype=np.intp)
+        if channel_type == 6:
+            # shift from xyzw to wxyz
+            components = (np.array([block.vector_index for block in blocks], dtype=np.intp) + 1) % 4
+        deltas[groups, :, components] = block_deltas
+    deltas = deltas.reshape(-1, initial_value.size)[:min(last_frame, end_block * 16)]
+
+    if channel_type == 6:
+        result = accumulate_float32(initial_value, deltas)
+    else:
+        result = np.cumsum(np.concatenate((initial_value, deltas[:, 0])))
+
+    if len(result) < last_frame + 1:
+        padding = np.repeat(result[-1:], last_frame + 1 - len(result), axis=0)
+        result = np.concatenate((result, padding))
+    return result[first_frame:last_frame + 1]
 
-    scale = 0.07435  # how to get this ???
 
-    num_time_codes = len(channel.data) - 1  # minus initial value
-    num_delta_blocks = int(num_time_codes / 16) + 1
-    deltas = [0x00] * (num_delta_blocks * 16)
+SCALE_MULTIPLIERS = [0.5, 0.75, 0.9, 1.1, 1.25, 1.5, 2.0]
 
-    default_value = None
 
-    for i, value in enumerate(channel.data):
-        if i == 0:
-            default_value = value
-            continue
+def encode_deltas(channel_type, values, initial_value, scale, num_bits):
+    limit = 8 if num_bits == 4 else 128
+    scale_factor = 1.0
+    if num_bits == 8:
+        scale_factor /= 16.0
+
+    vector_len = values.shape[1]
+    num_blocks = (len(values) + 15) >> 4
+    targets = np.concatenate((values[1:], np.repeat(values[-1:], num_blocks * 16 - len(values) + 1, axis=0)))
+    targets = targets.reshape(num_blocks, 16, vector_len)
+    num_valid = len(values) - 1
+
+    block_indices = np.zeros((num_blocks, vector_len), dtype=np.uint8)
+    deltas = np.zeros((num_blocks, vector_len, 16), dtype=np.int16)
+    max_error = float(np.abs(initial_value - values[0]).max())
+    if scale <= 0.0:
+        # all values are equal
+        return block_indices, deltas, max_error
+
+    steps = (scale * scale_factor * np.array(DELTA_TABLE))[:, None]
+    components = np.arange(vector_len)
+    previous = initial_value
+
+    for i in range(num_blocks):
+        # try all block indices at once, the decoder accumulates the rounded deltas so we have to as well
+        value = np.repeat(previous[None, :], len(DELTA_TABLE), axis=0)
+        block_deltas = np.empty((16, len(DELTA_TABLE), vector_len))
+        error = np.zeros(value.shape)
+
+        for j in range(16):
+            target = targets[i, j]
+            delta = np.clip(np.rint((target - value) / steps), -limit, limit - 1)
+            value += steps * delta
+            if channel_type == 6:
+                value = value.astype(np.float32).astype(np.float64)
+            block_deltas[j] = delta
+            if i * 16 + j < num_valid:
+                error = np.maximum(error, np.abs(value - target))
 
-        block_index = 33  # how to get this one?
+        best = np.argmin(error, axis=0)
+        block_indices[i] = best
+        deltas[i] = block_deltas[:, best, components].T
+        previous = value[best, components]
+        max_error = max(max_error, float(error[best, components].max()))
+    return block_indices, deltas, max_error
 
-        old = default_value
-        # if i > 1:
-        #    channel.data[i - 1]
-        delta = value - old
-        delta /= (scale_factor * scale * DELTA_TABLE[block_index])
 
-        delta = int(delta)
-        # print("delta: " + str(delta) + " index: " + str(block_index))
-        deltas[i - 1] = delta
+def encode(channel_type, vector_len, values, num_bits=4, tolerance=None):
+    limit = 8 if num_bits == 4 else 128
+    scale_factor = 1.0
+    if num_bits == 8:
+        scale_factor /= 16.0
 
-    deltas = set_deltas(deltas, num_bits)
-    return deltas
+    values = np.asarray(values, dtype=np.float64).reshape(len(values), vector_len)
+    if channel_type == 6:
+        # shift from wxyz to xyzw
+        values = np.roll(values, -1, axis=1)
+
+    # the decoder starts from the stored float values, so we have to do the same
+    initial_value = values[0].astype(np.float32).astype(np.float64)
+    max_delta = np.abs(np.diff(values, axis=0)).max(initial=0.0)
+    base_scale = float(np.float32(max_delta / ((limit - 1) * scale_factor)))
+    scale = base_scale
+    block_indices, deltas, max_error = encode_deltas(channel_type, values, initial_value, scale, num_bits)
+
+    if tolerance is not None and base_scale > 0.0:
+        # the block indices only reach steps up to the scale and the sine part of the table is coarse,
+        # so a slightly different scale often places the steps better, keep the one with the smallest error
+        for multiplier in SCALE_MULTIPLIERS:
+            candidate = float(np.float32(base_scale * multiplier))
+            result = encode_deltas(channel_type, values, initial_value, candidate, num_bits)
+            if result[2] < max_error:
+                scale = candidate
+                block_indices, deltas, max_error = result
+
+    num_blocks = len(block_indices)
+    delta_bytes = pack_deltas(deltas, num_bits).reshape(num_blocks * vector_len, -1)
+
+    initial = initial_value.tolist()
+    data = AdaptiveDeltaData(
+        initial_value=Quaternion(np.roll(initial, 1)) if channel_type == 6 else initial[0],
+        bit_count=num_bits)
+
+    for i, delta_block in enumerate(delta_bytes):
+        data.delta_blocks.append(AdaptiveDeltaBlock(
+            vector_index=i % vector_len,
+            block_index=int(block_indices.flat[i]),
+            delta_bytes=delta_block.tolist()))
+    return scale, data, max_error
@@ -102,7 +102,8 @@ def load_file(context, data_context, path=None):
 ##########################################################################
 
 
-def load(context):
+def load(context, import_settings=None):
+    import_settings = import_settings if import_settings is not None else {}
     data_context = DataContext()
 
     load_file(context, data_context)
@@ -141,7 +142,10 @@ def load(context):
                 data_context.collision_boxes,
                 data_context.animation,
                 data_context.compressed_animation,
-                data_context.dazzles)
+                data_context.dazzles,
+                import_settings.get('frame_range'),
+                import_settings.get('frame_rate'),
+                import_settings.get('reuse_materials', False))
     return {'FINISHED'}
 
 
@@ -1,6 +1,8 @@
 # <pep8 compliant>
 # Written by Stephan Vedder and Michael Schnabel
 
+import bisect
+import numpy as np
 from io_mesh_w3d.w3d.structs.version import Version
 from io_mesh_w3d.w3d.utils.helpers import *
 
@@ -14,6 +16,14 @@ TIME_CODED_FLAVOR = 0
 ADAPTIVE_DELTA_FLAVOR = 1
 
 
+def keys_in_window(keys, first_frame, last_frame):
+    # keep the keys around the window as well, they define the values at its borders
+    time_codes = [key.time_code for key in keys]
+    start = max(bisect.bisect_right(time_codes, first_frame) - 1, 0)
+    end = bisect.bisect_left(time_codes, last_frame) + 1
+    return keys[start:end]
+
+
 class CompressedAnimationHeader:
     def __init__(
             self,
@@ -121,6 +131,15 @@ class TimeCodedAnimationChannel:
         write_ubyte(self.type, io_stream)
         write_list(self.time_codes, io_stream, TimeCodedDatum.write, self.type)
 
+    def crop(self, first_frame, last_frame):
+        time_codes = keys_in_window(self.time_codes, first_frame, last_frame)
+        return TimeCodedAnimationChannel(
+            num_time_codes=len(time_codes),
+            pivot=self.pivot,
+            vector_len=self.vector_len,
+            type=self.type,
+            time_codes=time_codes)
+
 
 class AdaptiveDeltaBlock:
     def __init__(self, vector_index=0, block_index=0, delta_bytes=None):
@@ -176,6 +195,14 @@ class AdaptiveDeltaData:
         write_channel_value(self.initial_value, io_stream, type)
         write_list(self.delta_blocks, io_stream, AdaptiveDeltaBlock.write)
 
+    def crop(self, vector_len, last_frame):
+        # every value depends on all deltas before it, so only the blocks after the window can be dropped
+        num_blocks = (last_frame + 15) >> 4
+        return AdaptiveDeltaData(
+            initial_value=self.initial_value,
+            delta_blocks=self.delta_blocks[:num_blocks * vector_len],
+            bit_count=self.bit_count)
+
 
 class AdaptiveDeltaAnimationChannel:
     def __init__(self, num_time_codes=0, pivot=-1, vector_len=0, type=0, scale=0, data=None):
@@ -214,6 +241,16 @@ class AdaptiveDeltaAnimationChannel:
         self.data.write(io_stream, self.type)
         write_padding(io_stream, 3)
 
+    def crop(self, first_frame, last_frame):
+        num_time_codes = min(self.num_time_codes, last_frame + 1)
+        return AdaptiveDeltaAnimationChannel(
+            num_time_codes=num_time_codes,
+            pivot=self.pivot,
+            vector_len=self.vector_len,
+            type=self.type,
+            scale=self.scale,
+            data=self.data.crop(self.vector_len, num_time_codes - 1))
+
 
 class AdaptiveDeltaMotionAnimationChannel:
     def __init__(self, scale=0.0, data=None):
@@ -278,7 +315,10 @@ class TimeCodedBitChannel:
             type=read_ubyte(io_stream),
             default_value=read_ubyte(io_stream))
 
-        result.time_codes = read_fixed_list(io_stream, result.num_time_codes, TimeCodedBitDatum.read)
+        codes = np.frombuffer(io_stream.read(result.num_time_codes * 4), dtype='<u4')
+        time_codes = (codes & 0x7FFFFFFF).tolist()
+        values = (codes >> 31 == 1).tolist()
+        result.time_codes = [TimeCodedBitDatum(time_code=t, value=v) for t, v in zip(time_codes, values)]
         return result
 
     def size(self, include_head=True):
@@ -292,7 +332,18 @@ class TimeCodedBitChannel:
         write_ushort(self.pivot, io_stream)
         write_ubyte(self.type, io_stream)
         write_ubyte(self.default_value, io_stream)
-        write_list(self.time_codes, io_stream, TimeCodedBitDatum.write)
+        time_codes = np.array([datum.time_code for datum in self.time_codes], dtype='<u4')
+        values = np.array([bool(datum.value) for datum in self.time_codes], dtype='<u4')
+        io_stream.write((time_codes | (values << 31)).astype('<u4').tobytes())
+
+    def crop(self, first_frame, last_frame):
+        time_codes = keys_in_window(self.time_codes, first_frame, last_frame)
+        return TimeCodedBitChannel(
+            num_time_codes=len(time_codes),
+            pivot=self.pivot,
+            type=self.type,
+            default_value=self.default_value,
+            time_codes=time_codes)
 
 
 class MotionChannel:
@@ -373,6 +424,23 @@ class MotionChannel:
         else:
             self.data.write(io_stream, self.type)
 
+    def crop(self, first_frame, last_frame):
+        result = MotionChannel(
+            delta_type=self.delta_type,
+            vector_len=self.vector_len,
+            type=self.type,
+            pivot=self.pivot)
+
+        if self.delta_type == 0:
+            result.data = keys_in_window(self.data, first_frame, last_frame)
+            result.num_time_codes = len(result.data)
+        else:
+            result.num_time_codes = min(self.num_time_codes, last_frame + 1)
+            result.data = AdaptiveDeltaMotionAnimationChannel(
+                scale=self.data.scale,
+                data=self.data.data.crop(self.vector_len, result.num_time_codes - 1))
+        return result
+
 
 class CompressedAnimation:
     def __init__(self, header=None, time_coded_channels=None, adaptive_delta_channels=None,
@@ -384,7 +452,11 @@ class CompressedAnimation:
         self.motion_channels = motion_channels if motion_channels is not None else []
 
     def validate(self, context, w3x=False):
-        if not self.time_coded_channels:
+        channels = self.time_coded_channels
+        if self.header.flavor == ADAPTIVE_DELTA_FLAVOR:
+            channels = self.adaptive_delta_channels
+
+        if not channels and not self.motion_channels:
             context.error('Scene does not contain any animation data')
             return False
 
@@ -437,3 +509,14 @@ class CompressedAnimation:
         write_list(self.adaptive_delta_channels, io_stream, AdaptiveDeltaAnimationChannel.write)
         write_list(self.time_coded_bit_channels, io_stream, TimeCodedBitChannel.write)
         write_list(self.motion_channels, io_stream, MotionChannel.write)
+
+    def crop(self, first_frame, last_frame):
+        # frames keep their numbers, channels only hold what is needed to evaluate [first_frame, last_frame]
+        return CompressedAnimation(
+            header=self.header,
+            time_coded_channels=[channel.crop(first_frame, last_frame) for channel in self.time_coded_channels],
+            adaptive_delta_channels=[channel.crop(first_frame, last_frame)
+                                     for channel in self.adaptive_delta_channels],
+            time_coded_bit_channels=[channel.crop(first_frame, last_frame)
+                                     for channel in self.time_coded_bit_channels],
+            motion_channels=[channel.crop(first_frame, last_frame) for channel in self.motion_channels])
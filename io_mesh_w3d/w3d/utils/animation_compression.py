@@ -0,0 +1,380 @@
+# <pep8 compliant>
+# Written by Stephan Vedder and Michael Schnabel
+
+import math
+import numpy as np
+from mathutils import Quaternion
+from io_mesh_w3d.common.structs.animation import *
+from io_mesh_w3d.w3d.structs.compressed_animation import *
+from io_mesh_w3d.w3d.adaptive_delta import encode
+
+TRANSLATION_TOLERANCE = 0.001  # blender units
+ROTATION_TOLERANCE = 0.1  # degrees
+
+
+def continuous_quaternions(values):
+    # q and -q are the same rotation, flip every quaternion into the hemisphere of its predecessor
+    values = np.asarray(values, dtype=np.float64).reshape(-1, 4)
+    signs = np.where(np.sum(values[1:] * values[:-1], axis=1) < 0.0, -1.0, 1.0)
+    return values * np.cumprod(np.concatenate(([1.0], signs)))[:, None]
+
+
+def channel_values(channel, num_frames):
+    # values of the channel for every frame, held constant outside of its frame range
+    values = np.asarray(channel.data, dtype=np.float64).reshape(len(channel.data), -1)
+    frames = np.clip(np.arange(num_frames) - channel.first_frame, 0, len(values) - 1)
+    values = values[frames]
+    if values.shape[1] == 1:
+        return values[:, 0]
+    return continuous_quaternions(values)
+
+
+def component_tolerance(channel, translation_tolerance, rotation_tolerance):
+    if channel.type == CHANNEL_Q:
+        # a deviation of e per quaternion component rotates by at most ~4e radians
+        return math.radians(rotation_tolerance) / 4.0
+    return translation_tolerance
+
+
+def channel_tolerance(channel, translation_tolerance, rotation_tolerance):
+    if channel.type == CHANNEL_Q:
+        return math.radians(rotation_tolerance)
+    return translation_tolerance
+
+
+def rotation_angles(expected, actual):
+    # 4 * asin(|q - p| / 2) is the rotation angle between unit quaternions and stays precise for small angles
+    chord = np.minimum(np.linalg.norm(actual - expected, axis=1), np.linalg.norm(actual + expected, axis=1))
+    return 4.0 * np.arcsin(np.minimum(chord / 2.0, 1.0))
+
+
+def slerp(start, end, t):
+    if start @ end < 0.0:
+        end = -end
+    theta = math.acos(min(start @ end, 1.0))
+    if theta < 1e-6:
+        result = start + np.outer(t, end - start)
+    else:
+        result = (np.outer(np.sin((1.0 - t) * theta), start) + np.outer(np.sin(t * theta), end)) / math.sin(theta)
+    return result / np.linalg.norm(result, axis=1)[:, None]
+
+
+def interpolation_errors(values, start, end):
+    t = np.arange(1, end - start) / (end - start)
+    if values.ndim == 2:
+        return rotation_angles(values[start + 1:end], slerp(values[start], values[end], t))
+    return np.abs(values[start] + (values[end] - values[start]) * t - values[start + 1:end])
+
+
+def reduce_key_frames(values, tolerance):
+    # split segments at their worst frame until interpolation between the kept keys is within tolerance
+    keep = np.zeros(len(values), dtype=bool)
+    keep[[0, -1]] = True
+    segments = [(0, len(values) - 1)]
+
+    while segments:
+        start, end = segments.pop()
+        if end - start < 2:
+            continue
+
+        errors = interpolation_errors(values, start, end)
+        index = int(np.argmax(errors))
+        if errors[index] > tolerance:
+            split = start + 1 + index
+            keep[split] = True
+            segments.extend([(start, split), (split, end)])
+    return np.flatnonzero(keep)
+
+
+def create_time_coded_data(channel, values, frames):
+    result = []
+    for frame in frames.tolist():
+        if channel.type == CHANNEL_Q:
+            value = Quaternion(values[frame])
+        else:
+            value = float(values[frame])
+        result.append(TimeCodedDatum(time_code=frame, value=value))
+    return result
+
+
+def create_time_coded_channel(channel, num_frames, tolerance=0.0):
+    values = channel_values(channel, num_frames)
+    frames = reduce_key_frames(values, tolerance)
+
+    result = TimeCodedAnimationChannel(
+        num_time_codes=len(frames),
+        pivot=channel.pivot,
+        vector_len=channel.vector_len,
+        type=channel.type)
+
+    result.time_codes = create_time_coded_data(channel, values, frames)
+    return result
+
+
+def collapse_channel(channel):
+    if isinstance(channel, AnimationChannel):
+        channel.data = channel.data[:1]
+        channel.last_frame = channel.first_frame
+    else:
+        channel.time_codes = channel.time_codes[:1]
+        channel.num_time_codes = 1
+
+
+def eliminate_redundant_channels(context, animation, translation_tolerance=TRANSLATION_TOLERANCE,
+                                 rotation_tolerance=ROTATION_TOLERANCE):
+    # channels are relative to the bind pose of their pivot, which is zero translation and identity rotation
+    if isinstance(animation, Animation):
+        channels = animation.channels
+    else:
+        channels = animation.time_coded_channels
+
+    result = []
+    at_rest = []
+    num_collapsed = 0
+    for channel in channels:
+        if isinstance(channel, (AnimationBitChannel, TimeCodedBitChannel)) or channel.type == CHANNEL_VIS:
+            # visibility has no bind pose, a hidden track must not be dropped
+            result.append(channel)
+            continue
+
+        if isinstance(channel, AnimationChannel):
+            values = np.asarray(channel.data, dtype=np.float64)
+        elif isinstance(channel, TimeCodedAnimationChannel):
+            values = np.asarray([datum.value for datum in channel.time_codes], dtype=np.float64)
+        else:
+            result.append(channel)
+            continue
+
+        if len(values) == 0:
+            result.append(channel)
+            continue
+
+        tolerance = channel_tolerance(channel, translation_tolerance, rotation_tolerance)
+        if channel.type == CHANNEL_Q:
+            rest_error = rotation_angles(values, np.array([1.0, 0.0, 0.0, 0.0])).max()
+            constant_error = rotation_angles(values, values[0]).max()
+        else:
+            rest_error = np.abs(values).max()
+            constant_error = np.abs(values - values[0]).max()
+
+        if rest_error <= tolerance:
+            at_rest.append(channel)
+            continue
+
+        # the engine returns the bind pose outside of the frames of an uncompressed channel, so only
+        # time coded channels, which hold their last key, can be collapsed to a single one
+        if constant_error <= tolerance and len(values) > 1 and isinstance(channel, TimeCodedAnimationChannel):
+            collapse_channel(channel)
+            num_collapsed += 1
+        result.append(channel)
+
+    if not result and at_rest:
+        # an animation needs at least one channel
+        collapse_channel(at_rest[0])
+        result.append(at_rest.pop(0))
+
+    if isinstance(animation, Animation):
+        animation.channels = result
+    else:
+        animation.time_coded_channels = result
+
+    context.info(f'animation \'{animation.header.name}\': removed {len(at_rest)} channels in bind pose '
+                 f'and collapsed {num_collapsed} constant channels')
+    return animation
+
+
+def create_time_coded_bit_channel(channel, num_frames):
+    # only store the first frame and the frames where the visibility toggles
+    visible = channel_values(channel, num_frames) >= VISIBILITY_THRESHOLD
+    frames = np.concatenate(([0], np.flatnonzero(visible[1:] != visible[:-1]) + 1))
+
+    result = TimeCodedBitChannel(
+        num_time_codes=len(frames),
+        pivot=channel.pivot,
+        type=channel.type,
+        default_value=int(visible[0]))
+
+    for frame, value in zip(frames.tolist(), visible[frames].tolist()):
+        result.time_codes.append(TimeCodedBitDatum(time_code=frame, value=value))
+    return result
+
+
+def create_adaptive_delta_channel(channel, num_frames, num_bits=4, tolerance=None):
+    values = channel_values(channel, num_frames)
+    scale, data, error = encode(channel.type, channel.vector_len, values, num_bits, tolerance)
+
+    result = AdaptiveDeltaAnimationChannel(
+        num_time_codes=num_frames,
+        pivot=channel.pivot,
+        vector_len=channel.vector_len,
+        type=channel.type,
+        scale=scale,
+        data=data)
+    return result, error
+
+
+def create_motion_channel(channel, num_frames, tolerance=0.0, delta_tolerance=0.0):
+    values = channel_values(channel, num_frames)
+    frames = reduce_key_frames(values, tolerance)
+
+    candidates = [MotionChannel(
+        delta_type=0,
+        vector_len=channel.vector_len,
+        type=channel.type,
+        num_time_codes=len(frames),
+        pivot=channel.pivot,
+        data=create_time_coded_data(channel, values, frames))]
+
+    for delta_type in [1, 2]:
+        scale, data, error = encode(channel.type, channel.vector_len, values, delta_type * 4, delta_tolerance)
+        if error > delta_tolerance:
+            continue
+
+        candidates.append(MotionChannel(
+            delta_type=delta_type,
+            vector_len=channel.vector_len,
+            type=channel.type,
+            num_time_codes=num_frames,
+            pivot=channel.pivot,
+            data=AdaptiveDeltaMotionAnimationChannel(scale=scale, data=data)))
+    return min(candidates, key=lambda candidate: candidate.size())
+
+
+def create_compressed_animation(animation, flavor, version=Version(major=0, minor=1)):
+    header = animation.header
+    return CompressedAnimation(
+        header=CompressedAnimationHeader(
+            version=version,
+            name=header.name,
+            hierarchy_name=header.hierarchy_name,
+            num_frames=header.num_frames,
+            frame_rate=header.frame_rate,
+            flavor=flavor))
+
+
+def animation_size(animation):
+    if isinstance(animation, Animation):
+        return animation.size(False)
+    return animation.size()
+
+
+def create_time_coded_animation(context, animation, translation_tolerance=TRANSLATION_TOLERANCE,
+                                rotation_tolerance=ROTATION_TOLERANCE):
+    num_frames = animation.header.num_frames
+    result = create_compressed_animation(animation, TIME_CODED_FLAVOR)
+    num_keys = 0
+
+    for channel in animation.channels:
+        if isinstance(channel, AnimationBitChannel):
+            result.time_coded_bit_channels.append(create_time_coded_bit_channel(channel, num_frames))
+            continue
+
+        tolerance = channel_tolerance(channel, translation_tolerance, rotation_tolerance)
+        result.time_coded_channels.append(create_time_coded_channel(channel, num_frames, tolerance))
+        num_keys += num_frames
+
+    num_reduced_keys = sum(channel.num_time_codes for channel in result.time_coded_channels)
+    context.info(f'reduced keyframes of animation \'{animation.header.name}\': {num_keys} -> {num_reduced_keys}')
+    return result
+
+
+def create_adaptive_delta_animation(context, animation, translation_tolerance=TRANSLATION_TOLERANCE,
+                                    rotation_tolerance=ROTATION_TOLERANCE):
+    num_frames = animation.header.num_frames
+    result = create_compressed_animation(animation, ADAPTIVE_DELTA_FLAVOR)
+    exceeded = []
+
+    for channel in animation.channels:
+        if isinstance(channel, AnimationBitChannel):
+            result.time_coded_bit_channels.append(create_time_coded_bit_channel(channel, num_frames))
+            continue
+
+        tolerance = component_tolerance(channel, translation_tolerance, rotation_tolerance)
+        ad_channel, error = create_adaptive_delta_channel(channel, num_frames, tolerance=tolerance)
+        if error > tolerance:
+            exceeded.append(f'(pivot: {channel.pivot}, type: {channel.type}, error: {error:.5f} > {tolerance:.5f})')
+        result.adaptive_delta_channels.append(ad_channel)
+
+    if exceeded:
+        # the flavor holds either time coded or adaptive delta channels and only 4 bit deltas,
+        # so these channels keep the deltas with the smallest error
+        context.warning(f'adaptive delta error of animation \'{animation.header.name}\' exceeds the tolerance '
+                        f'for channels: {", ".join(exceeded)}, export it time coded to keep them within it')
+
+    context.info(f'compressed animation \'{animation.header.name}\': '
+                 f'{animation_size(animation)} -> {animation_size(result)} bytes')
+    return result
+
+
+def create_auto_compressed_animation(context, animation, translation_tolerance=TRANSLATION_TOLERANCE,
+                                     rotation_tolerance=ROTATION_TOLERANCE):
+    # motion channels are only understood by the BFME engines, so they are not considered here
+    num_frames = animation.header.num_frames
+    time_coded = create_compressed_animation(animation, TIME_CODED_FLAVOR)
+    adaptive_delta = create_compressed_animation(animation, ADAPTIVE_DELTA_FLAVOR)
+    adaptive_delta_valid = True
+    sizes = []
+
+    for channel in animation.channels:
+        if isinstance(channel, AnimationBitChannel):
+            bit_channel = create_time_coded_bit_channel(channel, num_frames)
+            time_coded.time_coded_bit_channels.append(bit_channel)
+            adaptive_delta.time_coded_bit_channels.append(bit_channel)
+            continue
+
+        tolerance = channel_tolerance(channel, translation_tolerance, rotation_tolerance)
+        delta_tolerance = component_tolerance(channel, translation_tolerance, rotation_tolerance)
+        tc_channel = create_time_coded_channel(channel, num_frames, tolerance)
+        ad_channel, error = create_adaptive_delta_channel(channel, num_frames, tolerance=delta_tolerance)
+        time_coded.time_coded_channels.append(tc_channel)
+        adaptive_delta.adaptive_delta_channels.append(ad_channel)
+
+        channel_sizes = {'U': channel.size(), 'TC': tc_channel.size()}
+        if error <= delta_tolerance:
+            channel_sizes['AD'] = ad_channel.size()
+        else:
+            adaptive_delta_valid = False
+        sizes.append((channel, channel_sizes))
+
+    candidates = {'U': animation}
+    if sizes:
+        candidates['TC'] = time_coded
+        if adaptive_delta_valid:
+            candidates['AD'] = adaptive_delta
+
+    # an animation holds its channels in a single representation, so all of them are stored as the smallest one
+    best = min(candidates, key=lambda key: animation_size(candidates[key]))
+    for channel, channel_sizes in sizes:
+        ad_size = channel_sizes.get('AD', 'exceeds tolerance')
+        context.info(f'channel (pivot: {channel.pivot}, type: {channel.type}) sizes '
+                     f'(U: {channel_sizes["U"]}, TC: {channel_sizes["TC"]}, AD: {ad_size}) -> stored as {best}: '
+                     f'saves {channel_sizes["U"] - channel_sizes[best]} bytes')
+
+    context.info(f'compressed animation \'{animation.header.name}\' as {best}: '
+                 f'{animation_size(animation)} -> {animation_size(candidates[best])} bytes')
+    return candidates[best]
+
+
+def create_motion_channel_animation(context, animation, translation_tolerance=TRANSLATION_TOLERANCE,
+                                    rotation_tolerance=ROTATION_TOLERANCE):
+    num_frames = animation.header.num_frames
+    result = create_compressed_animation(animation, TIME_CODED_FLAVOR, Version(major=1, minor=0))
+    num_delta_types = [0, 0, 0]
+
+    for channel in animation.channels:
+        if isinstance(channel, AnimationBitChannel):
+            result.time_coded_bit_channels.append(create_time_coded_bit_channel(channel, num_frames))
+            continue
+
+        motion_channel = create_motion_channel(
+            channel,
+            num_frames,
+            channel_tolerance(channel, translation_tolerance, rotation_tolerance),
+            component_tolerance(channel, translation_tolerance, rotation_tolerance))
+        num_delta_types[motion_channel.delta_type] += 1
+        result.motion_channels.append(motion_channel)
+
+    context.info(f'compressed animation \'{animation.header.name}\' into motion channels '
+                 f'(time coded: {num_delta_types[0]}, 4 bit: {num_delta_types[1]}, 8 bit: {num_delta_types[2]}): '
+                 f'{animation_size(animation)} -> {animation_size(result)} bytes')
+    return result
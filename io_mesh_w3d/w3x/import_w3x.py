@@ -60,7 +60,8 @@ skl_find_hint = ['', '_HRC', '_SKL']
 ctr_find_hint = ['', '_CTR']
 
 
-def load(context):
+def load(context, import_settings=None):
+    import_settings = import_settings if import_settings is not None else {}
     data_context = DataContext(
         meshes=[],
         textures=[],
@@ -161,6 +162,8 @@ def load(context):
     hlod = data_context.hlod
     animation = data_context.animation
 
-    create_data(context, meshes, hlod, hierarchy, boxes, animation)
+    create_data(context, meshes, hlod, hierarchy, boxes, animation,
+                frame_range=import_settings.get('frame_range'), frame_rate=import_settings.get('frame_rate'),
+                reuse_materials=import_settings.get('reuse_materials', False))
     context.info("Finished!")
     return {'FINISHED'}
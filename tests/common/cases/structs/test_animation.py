@@ -83,6 +83,40 @@ class TestAnimation(TestCase):
         bit_channel = AnimationBitChannel(data=data)
         self.assertEqual(10, bit_channel.size(False))
 
+    def test_bit_channel_write_read_bit_order(self):
+        data = [True, False, False, True, True, False, True, False, True, True]
+        expected = AnimationBitChannel(first_frame=2, last_frame=11, data=data)
+
+        io_stream = io.BytesIO()
+        expected.write(io_stream)
+        self.assertEqual(bytes([0b01011001, 0b00000011]), io_stream.getvalue()[-2:])
+
+        io_stream = io.BytesIO(io_stream.getvalue())
+        read_chunk_head(io_stream)
+        actual = AnimationBitChannel.read(io_stream)
+        self.assertEqual(data, actual.data)
+
+    def test_crop(self):
+        animation = get_animation()
+        channel = animation.channels[0]
+        channel.first_frame = 2
+        channel.last_frame = 6
+
+        actual = animation.crop(3, 4)
+
+        self.assertEqual(animation.header, actual.header)
+        self.assertEqual(len(animation.channels), len(actual.channels))
+        self.assertEqual(3, actual.channels[0].first_frame)
+        self.assertEqual(4, actual.channels[0].last_frame)
+        self.assertEqual(channel.data[1:3], actual.channels[0].data)
+        self.assertEqual(5, len(channel.data))
+
+        actual = animation.crop(8, 10)
+
+        self.assertEqual(6, actual.channels[0].first_frame)
+        self.assertEqual(6, actual.channels[0].last_frame)
+        self.assertEqual(channel.data[-1:], actual.channels[0].data)
+
     def test_write_read_xml(self):
         self.write_read_xml_test(get_animation(xml=True), 'W3DAnimation', Animation.parse, compare_animations, self)
 
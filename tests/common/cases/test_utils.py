@@ -702,10 +702,7 @@ class TestUtils(TestCase):
         create_data(self, [], None, hierarchy, [], None, animation)
 
         time_codes = [TimeCodedDatum(time_code=0, value=3.0),
-                        TimeCodedDatum(time_code=4, value=3.0)]
-    
-        if bpy.app.version >= (4, 2, 0):
-            time_codes = [TimeCodedDatum(time_code=0, value=3.0)]
+                      TimeCodedDatum(time_code=4, value=3.0)]
 
         channel = TimeCodedAnimationChannel(
             num_time_codes=len(time_codes),
@@ -815,10 +812,11 @@ class TestUtils(TestCase):
         if animation is not None:
             actual_animation = retrieve_animation(self,
                                                   animation.header.name, actual_hiera, rig, timecoded=False)
-            compare_animations(self, animation, actual_animation)
+            # quaternion channels are made continuous on import, which may flip their sign
+            compare_animations(self, animation, actual_animation, up_to_sign=True)
 
         if compressed_animation is not None:
             actual_compressed_animation = retrieve_animation(
                 self, compressed_animation.header.name, actual_hiera, rig, timecoded=True)
             compare_compressed_animations(
-                self, compressed_animation, actual_compressed_animation)
+                self, compressed_animation, actual_compressed_animation, up_to_sign=True)
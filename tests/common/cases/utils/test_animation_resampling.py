@@ -0,0 +1,120 @@
+# <pep8 compliant>
+# Written by Stephan Vedder and Michael Schnabel
+
+import numpy as np
+from io_mesh_w3d.common.utils.animation_resampling import *
+from io_mesh_w3d.w3d.utils.animation_compression import *
+from tests.common.helpers.animation import *
+from tests.w3d.helpers.compressed_animation import *
+from tests.utils import TestCase
+
+
+def get_dense_animation(frame_rate=30, num_frames=9):
+    animation = Animation(header=get_animation_header(), channels=[])
+    animation.header.frame_rate = frame_rate
+    animation.header.num_frames = num_frames
+
+    for type in [0, 1, 2]:
+        channel = get_animation_channel(type=type, pivot=1)
+        channel.last_frame = num_frames - 1
+        channel.data = [float(i * (type + 1)) for i in range(num_frames)]
+        animation.channels.append(channel)
+
+    rotation = get_animation_channel(type=6, pivot=1)
+    rotation.last_frame = num_frames - 1
+    rotation.data = [get_quat(np.cos(i * 0.1), 0.0, 0.0, np.sin(i * 0.1)) for i in range(num_frames)]
+    animation.channels.append(rotation)
+
+    visibility = get_animation_bit_channel(pivot=1)
+    visibility.last_frame = num_frames - 1
+    visibility.data = [i < 5 for i in range(num_frames)]
+    animation.channels.append(visibility)
+    return animation
+
+
+class TestAnimationResampling(TestCase):
+    def test_resample_with_same_frame_rate(self):
+        animation = get_dense_animation()
+
+        self.assertEqual(animation, resample_animation(self, animation, 30))
+        self.assertEqual(animation, resample_animation(self, animation, None))
+        self.assertIsNone(resample_animation(self, None, 15))
+
+    def test_resample_to_lower_frame_rate(self):
+        animation = get_dense_animation()
+
+        actual = resample_animation(self, animation, 15)
+
+        self.assertEqual(15, actual.header.frame_rate)
+        self.assertEqual(5, actual.header.num_frames)
+        self.assertEqual(animation.header.name, actual.header.name)
+        self.assertEqual(5, len(actual.channels))
+
+        for expected, channel in zip(animation.channels[:3], actual.channels[:3]):
+            self.assertEqual(expected.type, channel.type)
+            self.assertEqual(0, channel.first_frame)
+            self.assertEqual(4, channel.last_frame)
+            self.assertEqual(expected.data[::2], channel.data)
+
+        for i, value in enumerate(actual.channels[3].data):
+            compare_quats(self, animation.channels[3].data[i * 2], value)
+
+        self.assertTrue(isinstance(actual.channels[4], AnimationBitChannel))
+        self.assertEqual([True, True, True, False, False], actual.channels[4].data)
+
+    def test_resample_to_higher_frame_rate(self):
+        animation = get_dense_animation(frame_rate=15, num_frames=3)
+
+        actual = resample_animation(self, animation, 30)
+
+        self.assertEqual(5, actual.header.num_frames)
+        self.assertEqual([0.0, 1.0, 2.0, 3.0, 4.0], actual.channels[1].data)
+
+        rotation = actual.channels[3]
+        self.assertEqual(5, len(rotation.data))
+        for i, value in enumerate(rotation.data):
+            compare_quats(self, get_quat(np.cos(i * 0.05), 0.0, 0.0, np.sin(i * 0.05)), value)
+
+        self.assertEqual([True, True, True, True, True], actual.channels[4].data)
+
+    def test_resample_compressed_animation(self):
+        animation = get_dense_animation()
+        compressed = create_time_coded_animation(self, animation, 0.0, 0.0)
+
+        actual = resample_animation(self, compressed, 15)
+
+        self.assertTrue(isinstance(actual, Animation))
+        self.assertEqual(5, actual.header.num_frames)
+        self.assertEqual(animation.channels[2].data[::2], actual.channels[2].data)
+        self.assertEqual([True, True, True, False, False], actual.channels[4].data)
+
+    def test_resample_frame_range(self):
+        animation = get_dense_animation()
+        compressed = create_time_coded_animation(self, animation, 0.0, 0.0)
+
+        actual = resample_animation(self, compressed, 15, (1, 3))
+
+        self.assertEqual(5, actual.header.num_frames)
+        for channel in actual.channels:
+            self.assertEqual(1, channel.first_frame)
+            self.assertEqual(3, channel.last_frame)
+        self.assertEqual(animation.channels[2].data[2:7:2], actual.channels[2].data)
+        self.assertEqual([True, True, False], actual.channels[4].data)
+
+    def test_resample_with_same_frame_rate_crops_frame_range(self):
+        animation = get_dense_animation()
+
+        actual = resample_animation(self, animation, 30, (2, 4))
+
+        self.assertEqual(animation.header, actual.header)
+        self.assertEqual(animation.channels[0].data[2:5], actual.channels[0].data)
+
+    def test_resample_time_coded_bit_channel_uses_default_before_first_key(self):
+        channel = TimeCodedBitChannel(num_time_codes=1, pivot=1, default_value=1)
+        channel.time_codes = [TimeCodedBitDatum(time_code=4, value=False)]
+
+        actual = resample_visibility_channel(channel, 0.5, 5)
+
+        self.assertEqual(0, actual.first_frame)
+        self.assertEqual(4, actual.last_frame)
+        self.assertEqual([True, True, False, False, False], actual.data)
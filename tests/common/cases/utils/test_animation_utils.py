@@ -65,6 +65,37 @@ class TestAnimationUtils(TestCase):
 
         self.assertEqual(0, len(ani.channels))
 
+    def test_user_is_notified_once_per_nonexisting_bone(self):
+        hierarchy = get_hierarchy()
+        animation = get_animation()
+
+        pivot = len(hierarchy.pivots)
+        animation.channels = [get_animation_channel(type=0, pivot=pivot),
+                              get_animation_channel(type=1, pivot=pivot),
+                              get_animation_channel(type=6, pivot=pivot)]
+
+        rig = get_or_create_skeleton(hierarchy, get_collection())
+
+        with (patch.object(self, 'warning')) as warning_func:
+            create_animation(self, rig, animation, hierarchy)
+            warning_func.assert_called_once_with(
+                f'animation channel for bone with ID \'{pivot}\' is invalid -> armature has only {pivot} bones!')
+
+    def test_user_is_notified_once_per_bone_missing_in_rig(self):
+        hierarchy = get_hierarchy()
+        animation = get_animation()
+        animation.channels = [get_animation_channel(type=0, pivot=1),
+                              get_animation_channel(type=6, pivot=1)]
+
+        rig = get_or_create_skeleton(hierarchy, get_collection())
+        hierarchy.pivots[1].name = 'missing'
+
+        with (patch.object(self, 'warning')) as warning_func:
+            create_animation(self, rig, animation, hierarchy)
+            warning_func.assert_called_once_with(
+                'animation channel for bone \'missing\' is skipped -> '
+                f'armature \'{hierarchy.name()}\' has no such bone!')
+
     def test_retrieve_channels_uncompressed_only_one_frame(self):
         bpy.context.scene.frame_end = 2
         bpy.context.scene.frame_end = 10
@@ -98,6 +129,61 @@ class TestAnimationUtils(TestCase):
         self.assertEqual(1, len(ani.channels))
         self.assertTrue(isinstance(ani.channels[0], AnimationBitChannel))
 
+    def test_visibility_channel_roundtrip_timecoded(self):
+        hierarchy = get_hierarchy()
+        animation = get_compressed_animation_empty()
+        animation.header.num_frames = 20
+        animation.time_coded_bit_channels = [TimeCodedBitChannel(
+            num_time_codes=3,
+            pivot=1,
+            default_value=1,
+            time_codes=[TimeCodedBitDatum(time_code=0, value=True),
+                        TimeCodedBitDatum(time_code=5, value=False),
+                        TimeCodedBitDatum(time_code=12, value=True)])]
+
+        rig = get_or_create_skeleton(hierarchy, get_collection())
+        create_animation(self, rig, animation, hierarchy)
+
+        ani = retrieve_animation(self, 'name', hierarchy, rig, timecoded=True)
+
+        self.assertEqual(0, len(ani.time_coded_channels))
+        self.assertEqual(1, len(ani.time_coded_bit_channels))
+        channel = ani.time_coded_bit_channels[0]
+        self.assertEqual(1, channel.pivot)
+        self.assertEqual([0, 5, 12], [datum.time_code for datum in channel.time_codes])
+        self.assertEqual([True, False, True], [datum.value for datum in channel.time_codes])
+
+    def test_animation_import_keeps_the_borders_of_constant_runs(self):
+        hierarchy = get_hierarchy()
+        animation = get_animation()
+        animation.channels = [AnimationChannel(first_frame=0, last_frame=5, vector_len=1, type=0, pivot=1,
+                                               data=[1.0, 1.0, 1.0, 2.0, 2.0, 2.0])]
+
+        rig = get_or_create_skeleton(hierarchy, get_collection())
+        create_animation(self, rig, animation, hierarchy)
+
+        fcurves = rig.animation_data.action.fcurves
+        self.assertEqual(1, len(fcurves))
+        self.assertEqual([0.0, 2.0, 3.0, 5.0], [keyframe.co.x for keyframe in fcurves[0].keyframe_points])
+        self.assertEqual([1.0, 1.0, 2.0, 2.0], [keyframe.co.y for keyframe in fcurves[0].keyframe_points])
+
+    def test_animation_import_frame_range(self):
+        hierarchy = get_hierarchy()
+        animation = get_compressed_animation(
+            flavor=ADAPTIVE_DELTA_FLAVOR,
+            bit_channels=False,
+            motion_tc=False,
+            motion_ad4=False,
+            motion_ad8=False)
+
+        rig = get_or_create_skeleton(hierarchy, get_collection())
+        create_animation(self, rig, animation, hierarchy, frame_range=(2, 3))
+
+        self.assertEqual(2, bpy.context.scene.frame_start)
+        self.assertEqual(3, bpy.context.scene.frame_end)
+        for fcu in rig.animation_data.action.fcurves:
+            self.assertEqual([2.0, 3.0], [keyframe.co.x for keyframe in fcu.keyframe_points])
+
     def test_quaternions_are_normalized_on_export_uncompressed(self):
         bpy.context.scene.frame_end = 0
         bpy.context.scene.frame_end = 10
@@ -144,3 +230,17 @@ class TestAnimationUtils(TestCase):
         self.assertEqual(3, len(channel.time_codes))
         for tc in channel.time_codes:
             self.assertAlmostEqual(1.0, tc.value.magnitude, 1)
+
+    def test_animation_import_quaternions_are_continuous(self):
+        hierarchy = get_hierarchy()
+        animation = get_animation()
+        channel = get_animation_channel(type=6, pivot=1)
+        channel.data = [quat if i % 2 == 0 else -quat for i, quat in enumerate(channel.data)]
+        animation.channels = [channel]
+
+        rig = get_or_create_skeleton(hierarchy, get_collection())
+        create_animation(self, rig, animation, hierarchy)
+
+        values = [[keyframe.co.y for keyframe in fcu.keyframe_points] for fcu in rig.animation_data.action.fcurves]
+        for i in range(1, len(channel.data)):
+            self.assertTrue(sum(value[i] * value[i - 1] for value in values) >= 0.0)
@@ -76,7 +76,35 @@ class TestHelpers(TestCase):
 
                 report_func.assert_called()
 
+    def test_missing_texture_gets_a_small_placeholder(self):
+        with (patch.object(self, 'warning')) as report_func:
+            first = find_texture(self, 'missing.tga', 'missing_id.tga')
+            second = find_texture(self, 'missing.tga', 'missing_id.tga')
+
+            report_func.assert_called_once()
+
+        self.assertEqual(first, second)
+        self.assertEqual('missing_id.dds', first.name)
+        self.assertEqual(1, len(bpy.data.images))
+        self.assertEqual([placeholder_size, placeholder_size], list(first.size))
+
+    def test_found_texture_is_loaded_only_once(self):
+        copyfile(up(up(up(self.relpath()))) + '/testfiles/texture.dds', self.outpath() + 'texture.dds')
+
+        # the image is named after the file, so looking it up by the texture name does not find it
+        with (patch('io_mesh_w3d.common.utils.helpers.load_image', wraps=load_image)) as load_func, \
+                (patch('io_mesh_w3d.common.utils.helpers.insensitive_path', wraps=insensitive_path)) as path_func:
+            first = find_texture(self, 'texture.dds', 'texture_id.tga')
+            second = find_texture(self, 'texture.dds', 'texture_id.tga')
+
+            load_func.assert_called_once()
+            path_func.assert_called_once()
+
+        os.remove(self.outpath() + 'texture.dds')
+        self.assertEqual(first, second)
+        self.assertEqual(1, len(bpy.data.images))
+
     def test_call_create_uv_layer_without_tx_coords(self):
         fake_mat_pass = FakeClass()
 
-        create_uvlayer(self, None, None, None, fake_mat_pass)
+        create_uvlayer(self, None, None, fake_mat_pass)
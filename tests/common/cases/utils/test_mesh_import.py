@@ -89,6 +89,35 @@ class TestMeshImportUtils(TestCase):
             loop = [loop for loop in mesh.loops if loop.vertex_index == i][0]
             compare_vectors(self, expected_normals[i], loop.normal)
 
+    def test_skinned_mesh_vertex_group_weights(self):
+        mesh_name = 'soldier'
+        mesh_struct = get_mesh(mesh_name, skin=True)
+        hierarchy = get_hierarchy()
+        hlod = get_hlod()
+
+        create_mesh(self, mesh_struct, bpy.context.scene.collection)
+        get_or_create_skeleton(hierarchy, bpy.context.scene.collection)
+
+        rig = bpy.data.objects[hierarchy.name()]
+        rig_mesh(mesh_struct, hierarchy, rig, sub_object=hlod.lod_arrays[0].sub_objects[1])
+
+        mesh_ob = bpy.data.objects[mesh_name]
+        for i, vert_inf in enumerate(mesh_struct.vert_infs):
+            expected = {}
+            weight = vert_inf.bone_inf
+            if weight < 0.01 and vert_inf.xtra_inf < 0.01:
+                weight = 1.0
+            expected[hierarchy.pivots[vert_inf.bone_idx].name] = weight
+            if vert_inf.xtra_idx > 0:
+                name = hierarchy.pivots[vert_inf.xtra_idx].name
+                expected[name] = expected.get(name, 0.0) + vert_inf.xtra_inf
+
+            actual = {mesh_ob.vertex_groups[group.group].name: group.weight
+                      for group in mesh_ob.data.vertices[i].groups}
+            self.assertEqual(sorted(expected.keys()), sorted(actual.keys()))
+            for name, value in expected.items():
+                self.assertAlmostEqual(value, actual[name], 5)
+
     def test_unskinned_mesh_has_armature_as_parent(self):
         mesh_name = 'soldier'
         mesh_struct = get_mesh(mesh_name)
@@ -222,6 +251,28 @@ class TestMeshImportUtils(TestCase):
         self.assertEqual(1, len(mesh.face_maps))
         self.assertEqual('Default', mesh.face_maps[0].name)
 
+    def test_mesh_import_surface_types_are_grouped_into_face_maps(self):
+        mesh_name = 'mesh'
+        mesh_struct = get_mesh(mesh_name)
+        for i, triangle in enumerate(mesh_struct.triangles):
+            triangle.surface_type = 2 - i % 2
+
+        create_mesh(self, mesh_struct, bpy.context.scene.collection)
+
+        from io_mesh_w3d.common.structs.mesh_structs.triangle import surface_types
+        num_triangles = len(mesh_struct.triangles)
+        if bpy.app.version < (4, 0, 0):
+            face_maps = bpy.data.objects[mesh_name].face_maps
+            mesh = bpy.data.meshes[mesh_name]
+            self.assertEqual([i % 2 for i in range(num_triangles)], [val.value for val in mesh.face_maps[0].data])
+        else:
+            mesh = bpy.data.meshes[mesh_name]
+            face_maps = mesh.face_maps
+            self.assertEqual([i % 2 for i in range(num_triangles)],
+                             [val.value for val in mesh.attributes[face_map_attribute].data])
+
+        self.assertEqual([surface_types[2], surface_types[1]], [face_map.name for face_map in face_maps])
+
     def test_mesh_import_multiple_uv_coords_in_tx_stage(self):
         mesh_name = 'mesh'
         mesh_struct = get_mesh(mesh_name)
@@ -250,6 +301,24 @@ class TestMeshImportUtils(TestCase):
         self.assertEqual('DIG_1', mesh.vertex_colors[4].name)
         self.assertEqual('SCG_1', mesh.vertex_colors[5].name)
 
+        for loop in mesh.loops:
+            expected = mesh_struct.material_passes[0].dcg[loop.vertex_index].to_vector_rgba()
+            actual = mesh.vertex_colors[0].data[loop.index].color
+            for j in range(4):
+                self.assertAlmostEqual(expected[j], actual[j], 2)
+
+    def test_mesh_import_uvs_are_imported_correctly(self):
+        mesh_name = 'mesh'
+        mesh_struct = get_mesh(mesh_name)
+
+        create_mesh(self, mesh_struct, bpy.context.scene.collection)
+
+        mesh = bpy.data.objects[mesh_name].data
+        tx_coords = mesh_struct.material_passes[0].tx_stages[0].tx_coords[0]
+
+        for loop in mesh.loops:
+            compare_vectors2(self, tx_coords[loop.vertex_index], mesh.uv_layers[0].data[loop.index].uv)
+
     def test_mesh_import_tx_stage_has_no_tx_coords(self):
         mesh_name = 'mesh'
         mesh_struct = get_mesh(mesh_name)
@@ -274,3 +343,24 @@ class TestMeshImportUtils(TestCase):
             create_mesh(self, mesh_struct, bpy.context.scene.collection)
         except Exception as e:
             raise e
+
+    def test_mesh_import_identical_materials_are_shared(self):
+        material_cache.clear()
+        create_mesh(self, get_mesh('mesh1'), bpy.context.scene.collection)
+        create_mesh(self, get_mesh('mesh2'), bpy.context.scene.collection)
+
+        materials = [material.name for material in bpy.data.meshes['mesh1'].materials]
+        self.assertEqual(materials, [material.name for material in bpy.data.meshes['mesh2'].materials])
+        self.assertEqual(len(set(materials)), len(bpy.data.materials))
+
+    def test_mesh_import_different_materials_are_not_shared(self):
+        material_cache.clear()
+        mesh_struct = get_mesh('mesh2')
+        for vert_mat in mesh_struct.vert_materials:
+            vert_mat.vm_info.opacity = 0.25
+
+        create_mesh(self, get_mesh('mesh1'), bpy.context.scene.collection)
+        create_mesh(self, mesh_struct, bpy.context.scene.collection)
+
+        materials = set(material.name for material in bpy.data.meshes['mesh1'].materials)
+        self.assertFalse(materials & set(material.name for material in bpy.data.meshes['mesh2'].materials))
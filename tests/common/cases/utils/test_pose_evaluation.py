@@ -0,0 +1,116 @@
+# <pep8 compliant>
+# Written by Stephan Vedder and Michael Schnabel
+
+import numpy as np
+from io_mesh_w3d.common.utils.pose_evaluation import *
+from io_mesh_w3d.w3d.utils.animation_compression import *
+from tests.common.helpers.animation import *
+from tests.common.helpers.hierarchy import *
+from tests.utils import TestCase
+
+
+def get_chain_hierarchy():
+    hierarchy = get_hierarchy()
+    hierarchy.pivots = [get_roottransform(),
+                        get_hierarchy_pivot(name='b_upper', parent=0),
+                        get_hierarchy_pivot(name='b_lower', parent=1)]
+    for pivot in hierarchy.pivots:
+        pivot.translation = get_vec(1.0, 0.0, 0.0)
+        pivot.rotation = get_quat(1.0, 0.0, 0.0, 0.0)
+    hierarchy.header.num_pivots = len(hierarchy.pivots)
+    return hierarchy
+
+
+def get_chain_animation():
+    animation = Animation(header=get_animation_header(), channels=[])
+    animation.header.num_frames = 3
+
+    rotation = get_animation_channel(type=6, pivot=1)
+    rotation.last_frame = 2
+    rotation.data = [get_quat(1.0, 0.0, 0.0, 0.0),
+                     get_quat(0.9239, 0.0, 0.0, 0.3827),
+                     get_quat(0.7071, 0.0, 0.0, 0.7071)]
+
+    translation = get_animation_channel(type=2, pivot=2)
+    translation.last_frame = 2
+    translation.data = [0.0, 1.0, 2.0]
+
+    animation.channels = [rotation, translation, get_animation_bit_channel(pivot=2)]
+    return animation
+
+
+class TestPoseEvaluation(TestCase):
+    def test_rest_pose(self):
+        actual = evaluate_pose(get_chain_hierarchy())
+
+        self.assertEqual((3, 4, 4), actual.shape)
+        for i in range(3):
+            np.testing.assert_allclose(np.eye(3), actual[i, :3, :3], atol=1e-6)
+            np.testing.assert_allclose([i + 1.0, 0.0, 0.0], actual[i, :3, 3], atol=1e-6)
+
+    def test_rest_pose_with_rotated_pivots(self):
+        hierarchy = get_hierarchy()
+
+        actual = evaluate_pose(hierarchy)
+
+        for i, pivot in enumerate(hierarchy.pivots):
+            local = transform_matrices(np.array(list(pivot.translation)), np.array(list(pivot.rotation)))
+            expected = local if pivot.parent_id < 0 else actual[pivot.parent_id] @ local
+            np.testing.assert_allclose(expected, actual[i], atol=1e-6)
+
+    def test_animated_pose(self):
+        actual = evaluate_pose(get_chain_hierarchy(), get_chain_animation(), 2)
+
+        np.testing.assert_allclose([1.0, 0.0, 0.0], actual[0, :3, 3], atol=1e-3)
+        np.testing.assert_allclose([2.0, 0.0, 0.0], actual[1, :3, 3], atol=1e-3)
+        np.testing.assert_allclose([2.0, 1.0, 2.0], actual[2, :3, 3], atol=1e-3)
+
+    def test_interpolated_pose(self):
+        actual = evaluate_pose(get_chain_hierarchy(), get_chain_animation(), 1.5)
+
+        np.testing.assert_allclose([2.0 + np.cos(np.pi * 3 / 8), np.sin(np.pi * 3 / 8), 1.5],
+                                   actual[2, :3, 3], atol=1e-3)
+
+    def test_poses_are_held_outside_of_the_animation(self):
+        hierarchy = get_chain_hierarchy()
+        animation = get_chain_animation()
+
+        actual = evaluate_pose(hierarchy, animation, [-3, 0, 2, 10])
+
+        np.testing.assert_allclose(actual[1], actual[0], atol=1e-6)
+        np.testing.assert_allclose(actual[2], actual[3], atol=1e-6)
+
+    def test_batch_matches_single_frames(self):
+        hierarchy = get_hierarchy()
+        animation = get_animation()
+        frames = np.linspace(0.0, 4.0, 9)
+
+        actual = evaluate_pose(hierarchy, animation, frames)
+
+        self.assertEqual((9, len(hierarchy.pivots), 4, 4), actual.shape)
+        for i, frame in enumerate(frames):
+            np.testing.assert_allclose(evaluate_pose(hierarchy, animation, frame), actual[i], atol=1e-9)
+
+    def test_compressed_animations_match_uncompressed(self):
+        hierarchy = get_hierarchy()
+        animation = get_animation()
+        frames = np.arange(animation.header.num_frames)
+        expected = evaluate_pose(hierarchy, animation, frames)
+
+        for compressed in [create_time_coded_animation(self, animation, 0.0, 0.0),
+                           create_motion_channel_animation(self, animation, 0.0, 0.0)]:
+            actual = evaluate_pose(hierarchy, compressed, frames)
+            np.testing.assert_allclose(expected, actual, atol=1e-6)
+
+        compressed = create_motion_channel_animation(self, animation)
+        actual = evaluate_pose(hierarchy, compressed, frames)
+        np.testing.assert_allclose(expected, actual, atol=2.0 * TRANSLATION_TOLERANCE)
+
+    def test_parents_have_to_come_before_their_children(self):
+        hierarchy = get_chain_hierarchy()
+        hierarchy.pivots[1].parent_id = 2
+
+        self.assertRaises(Exception, evaluate_pose, hierarchy)
+
+        hierarchy.pivots[1].parent_id = 1
+        self.assertRaises(Exception, evaluate_pose, hierarchy)
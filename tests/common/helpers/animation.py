@@ -46,7 +46,7 @@ def get_animation_channel(type=1, pivot=0):
     return channel
 
 
-def compare_animation_channels(self, expected, actual):
+def compare_animation_channels(self, expected, actual, up_to_sign=False):
     self.assertEqual(expected.first_frame, actual.first_frame)
     self.assertEqual(expected.last_frame, actual.last_frame)
     self.assertEqual(expected.vector_len, actual.vector_len)
@@ -58,6 +58,8 @@ def compare_animation_channels(self, expected, actual):
     for i in range(len(expected.data)):
         if expected.type < 6:
             self.assertAlmostEqual(expected.data[i], actual.data[i], 5)
+        elif up_to_sign:
+            compare_rotations(self, expected.data[i], actual.data[i])
         else:
             compare_quats(self, expected.data[i], actual.data[i])
 
@@ -131,7 +133,7 @@ def get_animation_empty():
         channels=[])
 
 
-def compare_animations(self, expected, actual):
+def compare_animations(self, expected, actual, up_to_sign=False):
     compare_animation_headers(self, expected.header, actual.header)
 
     self.assertEqual(len(expected.channels), len(actual.channels))
@@ -144,7 +146,7 @@ def compare_animations(self, expected, actual):
                 continue
 
             if chan.type == act.type and chan.pivot == act.pivot:
-                compare_animation_channels(self, chan, act)
+                compare_animation_channels(self, chan, act, up_to_sign)
                 match_found = True
         self.assertTrue(match_found)
 
@@ -45,6 +45,13 @@ def compare_quats(self, expected, actual):
     self.assertAlmostEqual(expected.z, actual.z, 1)
 
 
+def compare_rotations(self, expected, actual):
+    # q and -q are the same rotation
+    if expected.dot(actual) < 0.0:
+        actual = -actual
+    compare_quats(self, expected, actual)
+
+
 def get_mat(row0=None, row1=None, row2=None):
     mat = Matrix(([1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0]))
     if row0 is not None:
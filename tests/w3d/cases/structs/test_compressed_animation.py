@@ -56,6 +56,55 @@ class TestCompressedAnimation(TestCase):
         actual = CompressedAnimation.read(self, io_stream, chunkEnd)
         compare_compressed_animations(self, expected, actual)
 
+    def test_time_coded_bit_channel_write_read(self):
+        expected = get_time_coded_bit_channel()
+        expected.time_codes = [TimeCodedBitDatum(time_code=i * 3, value=i % 3 == 0) for i in range(55)]
+
+        io_stream = io.BytesIO()
+        expected.write(io_stream)
+        io_stream = io.BytesIO(io_stream.getvalue())
+
+        (chunkType, chunkSize, _) = read_chunk_head(io_stream)
+        self.assertEqual(W3D_CHUNK_COMPRESSED_BIT_CHANNEL, chunkType)
+        self.assertEqual(expected.size(False), chunkSize)
+
+        actual = TimeCodedBitChannel.read(io_stream)
+        compare_time_coded_bit_channels(self, expected, actual)
+
+    def test_crop(self):
+        animation = get_compressed_animation()
+        channel = animation.time_coded_channels[0]
+        channel.time_codes = [TimeCodedDatum(time_code=i * 4, value=float(i)) for i in range(10)]
+        channel.num_time_codes = 10
+
+        actual = animation.crop(9, 20)
+
+        self.assertEqual(animation.header, actual.header)
+        self.assertEqual(len(animation.time_coded_channels), len(actual.time_coded_channels))
+        self.assertEqual([8, 12, 16, 20], [datum.time_code for datum in actual.time_coded_channels[0].time_codes])
+        self.assertEqual(4, actual.time_coded_channels[0].num_time_codes)
+        self.assertEqual(10, channel.num_time_codes)
+
+        for expected, motion_channel in zip(animation.motion_channels, actual.motion_channels):
+            self.assertEqual(expected.delta_type, motion_channel.delta_type)
+            if motion_channel.delta_type == 0:
+                self.assertEqual(len(motion_channel.data), motion_channel.num_time_codes)
+            else:
+                self.assertEqual(min(expected.num_time_codes, 21), motion_channel.num_time_codes)
+                self.assertEqual(2 * motion_channel.vector_len, len(motion_channel.data.data.delta_blocks))
+
+    def test_time_coded_bit_channel_crop_keeps_value_before_window(self):
+        channel = TimeCodedBitChannel(num_time_codes=3, default_value=1, time_codes=[
+            TimeCodedBitDatum(time_code=0, value=True),
+            TimeCodedBitDatum(time_code=5, value=False),
+            TimeCodedBitDatum(time_code=30, value=True)])
+
+        actual = channel.crop(10, 20)
+
+        self.assertEqual(2, actual.num_time_codes)
+        self.assertEqual(1, actual.default_value)
+        self.assertEqual([(5, False), (30, True)], [(datum.time_code, datum.value) for datum in actual.time_codes])
+
     def test_validate(self):
         ani = get_compressed_animation()
         self.assertTrue(ani.validate(self))
@@ -72,6 +121,9 @@ class TestCompressedAnimation(TestCase):
 
         ani = get_compressed_animation()
         ani.time_coded_channels = []
+        self.assertTrue(ani.validate(self))
+
+        ani.motion_channels = []
         self.assertFalse(ani.validate(self))
         self.assertFalse(ani.validate(self, w3x=True))
 
@@ -2,6 +2,7 @@
 # Written by Stephan Vedder and Michael Schnabel
 
 import unittest
+import numpy as np
 
 from io_mesh_w3d.w3d.adaptive_delta import *
 from tests.common.helpers.animation import *
@@ -9,6 +10,40 @@ from tests.w3d.helpers.compressed_animation import *
 from tests.utils import TestCase
 
 
+def reference_decode(channel_type, vector_len, num_time_codes, scale, data):
+    # the original per delta decoder
+    scale_factor = 1.0
+    if data.bit_count == 8:
+        scale_factor /= 16.0
+
+    result = [None] * num_time_codes
+    result[0] = data.initial_value
+
+    for i, delta_block in enumerate(data.delta_blocks):
+        delta_scale = scale * scale_factor * DELTA_TABLE[delta_block.block_index]
+        deltas = get_deltas(delta_block.delta_bytes, data.bit_count)
+
+        for j, delta in enumerate(deltas):
+            idx = int(i / vector_len) * 16 + j + 1
+            if idx >= num_time_codes:
+                break
+
+            if channel_type == 6:
+                index = (delta_block.vector_index + 1) % 4
+                value = result[idx - 1][index] + delta_scale * delta
+                if result[idx] is None:
+                    result[idx] = result[idx - 1].copy()
+                result[idx][index] = value
+            else:
+                result[idx] = result[idx - 1] + delta_scale * delta
+    return result
+
+
+def random_walk(num_frames, vector_len):
+    steps = np.random.RandomState(7).uniform(-0.05, 0.05, (num_frames, vector_len))
+    return np.cumsum(steps, axis=0) + np.linspace(0.2, 0.8, vector_len)
+
+
 class TestAdaptiveDelta(TestCase):
     def test_get_deltas_4bit(self):
         deltaBytes = [-3, 17, -32, -101, 120, 88, -20, -1]
@@ -36,6 +71,22 @@ class TestAdaptiveDelta(TestCase):
 
         self.assertEqual(expected, actual)
 
+    def test_get_set_deltas_roundtrip_all_bytes(self):
+        for num_bits in [4, 8]:
+            for i in range(-128, 128, num_bits * 2):
+                delta_bytes = list(range(i, i + num_bits * 2))
+                self.assertEqual(delta_bytes, set_deltas(get_deltas(delta_bytes, num_bits), num_bits))
+
+    def test_unpack_deltas_of_multiple_blocks(self):
+        delta_bytes = [[-3, 17, -32, -101, 120, 88, -20, -1],
+                       [84, 119, 119, 53, 0, 16, 82, 0]]
+
+        actual = unpack_deltas(delta_bytes, 4)
+
+        self.assertEqual((2, 16), actual.shape)
+        self.assertEqual(get_deltas(delta_bytes[0], 4), actual[0].tolist())
+        self.assertEqual(get_deltas(delta_bytes[1], 4), actual[1].tolist())
+
     def test_decode_channel_ad(self):
         channel = get_adaptive_delta_animation_channel(type=0)
         expected = [4.3611, 15.5264, 29.4832, 49.0226, 68.5621]
@@ -46,6 +97,93 @@ class TestAdaptiveDelta(TestCase):
         for i, value in enumerate(expected):
             self.assertAlmostEqual(value, actual[i], 3)
 
+    def test_decode_channel_ad_8bit(self):
+        channel = get_adaptive_delta_animation_channel(type=0, num_bits=8)
+        expected = [4.3611, -1.3961, -16.0506, -36.2879, -58.2698]
+
+        actual = decode(channel.type, channel.vector_len, channel.num_time_codes, channel.scale, channel.data)
+
+        self.assertEqual(len(expected), len(actual))
+        for i, value in enumerate(expected):
+            self.assertAlmostEqual(value, actual[i], 3)
+
+    def test_decode_channel_ad_quaternion(self):
+        channel = get_adaptive_delta_animation_channel(type=6)
+        expected = [get_quat(0.9904, 0.1199, -0.0631, 0.0284),
+                    get_quat(12.1558, 11.2853, 11.1023, 11.1938),
+                    get_quat(26.1125, 25.242, 25.059, 25.1505),
+                    get_quat(45.652, 44.7815, 44.5985, 44.69),
+                    get_quat(65.1914, 64.3209, 64.1379, 64.2294)]
+
+        actual = decode(channel.type, channel.vector_len, channel.num_time_codes, channel.scale, channel.data)
+
+        self.assertEqual(len(expected), len(actual))
+        for i, value in enumerate(expected):
+            for j in range(4):
+                self.assertAlmostEqual(value[j], actual[i][j], 3)
+
+    def test_decode_is_identical_to_reference_decoder(self):
+        values = random_walk(70, 1)[:, 0]
+        for num_bits in [4, 8]:
+            scale, data, _ = encode(0, 1, values, num_bits)
+            expected = reference_decode(0, 1, len(values), scale, data)
+
+            actual = decode(0, 1, len(values), scale, data)
+
+            self.assertEqual(expected, actual.tolist())
+
+    def test_decode_quaternion_is_identical_to_reference_decoder(self):
+        values = random_walk(70, 4)
+        for num_bits in [4, 8]:
+            scale, data, _ = encode(6, 4, values, num_bits)
+            # components are placed by their vector index, not by the order of the blocks
+            for i in range(0, len(data.delta_blocks), 4):
+                data.delta_blocks[i:i + 4] = data.delta_blocks[i:i + 4][::-1]
+            expected = reference_decode(6, 4, len(values), scale, data)
+
+            actual = decode(6, 4, len(values), scale, data)
+
+            for i, quat in enumerate(expected):
+                self.assertEqual(list(quat), actual[i].tolist())
+
+    def test_decode_frame_range(self):
+        values = np.cumsum(np.sin(np.arange(100) / 5.0))
+        for num_bits in [4, 8]:
+            scale, data, _ = encode(0, 1, values, num_bits)
+            expected = decode(0, 1, len(values), scale, data)
+
+            for (first, last) in [(0, 0), (0, 99), (16, 31), (37, 52), (90, 120)]:
+                actual = decode(0, 1, len(values), scale, data, first, last)
+                self.assertEqual(len(expected[first:last + 1]), len(actual))
+                for i, value in enumerate(expected[first:last + 1]):
+                    self.assertAlmostEqual(value, actual[i], 5)
+
+    def test_decode_frame_range_quaternion(self):
+        channel = get_adaptive_delta_animation_channel(type=6)
+        expected = decode(channel.type, channel.vector_len, channel.num_time_codes, channel.scale, channel.data)
+
+        actual = decode(channel.type, channel.vector_len, channel.num_time_codes, channel.scale, channel.data, 2, 3)
+
+        self.assertEqual((2, 4), actual.shape)
+        for i in range(2):
+            for j in range(4):
+                self.assertAlmostEqual(expected[i + 2][j], actual[i][j], 5)
+
+    def test_crop_keeps_decoding_exact(self):
+        for (channel_type, vector_len) in [(0, 1), (6, 4)]:
+            values = random_walk(100, vector_len)
+            scale, data, _ = encode(channel_type, vector_len, values)
+            channel = AdaptiveDeltaAnimationChannel(num_time_codes=100, vector_len=vector_len, type=channel_type,
+                                                    scale=scale, data=data)
+            expected = decode(channel_type, vector_len, 100, scale, data, 20, 40)
+
+            actual = channel.crop(20, 40)
+
+            self.assertEqual(41, actual.num_time_codes)
+            self.assertEqual(3 * vector_len, len(actual.data.delta_blocks))
+            decoded = decode(channel_type, vector_len, actual.num_time_codes, actual.scale, actual.data, 20, 40)
+            self.assertEqual(expected.tolist(), decoded.tolist())
+
     def test_decode_motion_channel_ad(self):
         channel = get_motion_channel(type=0, delta_type=1, num_time_codes=5)
         expected = [4.3611, 4.6254, 4.9559, 5.4186, 5.8812]
@@ -57,31 +195,54 @@ class TestAdaptiveDelta(TestCase):
             self.assertAlmostEqual(value, actual[i], 3)
 
     def test_encode_8bit(self):
-        channel = AnimationChannel(
-            first_frame=0,
-            last_frame=7,
-            type=1,
-            pivot=2,
-            unknown=0,
-            data=[4.3611, 4.3611, 4.6254, 4.9559, 5.4186, 5.8812])
-        expected = [95, 44, 12, 2, 12, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+        values = [4.3611, 4.3611, 4.6254, 4.9559, 5.4186, 5.8812]
 
-        actual = encode(channel, num_bits=8)
+        scale, data, error = encode(1, 1, values, num_bits=8)
 
-        # self.assertEqual(len(expected), len(actual))
-        # self.assertEqual(expected, actual)
+        self.assertEqual(8, data.bit_count)
+        self.assertEqual(1, len(data.delta_blocks))
+        self.assertEqual(16, len(data.delta_blocks[0].delta_bytes))
+        self.assertTrue(error < 0.01)
+
+        actual = decode(1, 1, len(values), scale, data)
+        for i, value in enumerate(values):
+            self.assertTrue(abs(value - actual[i]) <= error + 1e-9)
 
     def test_encode_4bit(self):
-        channel = AnimationChannel(
-            first_frame=0,
-            last_frame=7,
-            type=1,
-            pivot=2,
-            unknown=0,
-            data=[4.3611, 4.3611, 4.6254, 4.9559, 5.4186, 5.8812])
-        expected = []  # ?
-
-        actual = encode(channel, num_bits=4)
-
-        # self.assertEqual(len(expected), len(actual))
-        # self.assertEqual(expected, actual)
+        values = [4.3611, 4.3611, 4.6254, 4.9559, 5.4186, 5.8812]
+
+        scale, data, error = encode(1, 1, values, num_bits=4)
+
+        self.assertEqual(4, data.bit_count)
+        self.assertEqual(1, len(data.delta_blocks))
+        self.assertEqual(8, len(data.delta_blocks[0].delta_bytes))
+        self.assertTrue(error < 0.01)
+
+        actual = decode(1, 1, len(values), scale, data)
+        for i, value in enumerate(values):
+            self.assertTrue(abs(value - actual[i]) <= error + 1e-9)
+
+    def test_encode_quaternion(self):
+        channel = get_animation_channel(type=6)
+        channel.data = channel.data * 4
+
+        scale, data, error = encode(channel.type, channel.vector_len, channel.data, num_bits=8)
+
+        self.assertEqual(8, len(data.delta_blocks))
+        self.assertEqual([0, 1, 2, 3, 0, 1, 2, 3], [block.vector_index for block in data.delta_blocks])
+        compare_quats(self, channel.data[0], data.initial_value)
+
+        actual = decode(channel.type, channel.vector_len, len(channel.data), scale, data)
+        for i, value in enumerate(channel.data):
+            for j in range(4):
+                self.assertTrue(abs(value[j] - actual[i][j]) <= error + 1e-6)
+
+    def test_encode_constant_channel(self):
+        values = [2.0] * 20
+
+        scale, data, error = encode(0, 1, values)
+
+        self.assertEqual(0.0, scale)
+        self.assertEqual(0.0, error)
+        self.assertEqual(2, len(data.delta_blocks))
+        self.assertEqual(values, decode(0, 1, len(values), scale, data).tolist())
@@ -0,0 +1,439 @@
+# <pep8 compliant>
+# Written by Stephan Vedder and Michael Schnabel
+
+import io
+import math
+import numpy as np
+from unittest.mock import patch
+
+from io_mesh_w3d.w3d.adaptive_delta import decode
+from io_mesh_w3d.w3d.utils.animation_compression import *
+from tests.common.helpers.animation import *
+from tests.utils import TestCase
+from tests.w3d.helpers.compressed_animation import get_compressed_animation
+
+
+class TestAnimationCompression(TestCase):
+    def test_channel_values_are_held_outside_of_frame_range(self):
+        channel = get_animation_channel(type=1)
+        channel.first_frame = 2
+        channel.last_frame = 6
+
+        actual = channel_values(channel, 10)
+
+        self.assertEqual([3.0, 3.0, 3.0, 3.5, 2.0, 1.0, -1.0, -1.0, -1.0, -1.0], actual.tolist())
+
+    def test_channel_values_quaternion(self):
+        channel = get_animation_channel(type=6)
+
+        actual = channel_values(channel, 5)
+
+        self.assertEqual((5, 4), actual.shape)
+        for i, quat in enumerate(channel.data):
+            compare_rotations(self, quat, Quaternion(actual[i]))
+
+    def test_channel_values_quaternion_are_continuous(self):
+        channel = get_animation_channel(type=6)
+        channel.data = [quat if i % 2 == 0 else -quat for i, quat in enumerate(channel.data)]
+
+        actual = channel_values(channel, 5)
+
+        self.assertTrue(np.all(np.sum(actual[1:] * actual[:-1], axis=1) >= 0.0))
+        for i, quat in enumerate(get_animation_channel(type=6).data):
+            compare_rotations(self, quat, Quaternion(actual[i]))
+
+    def test_continuous_quaternions(self):
+        values = [[1.0, 0.0, 0.0, 0.0],
+                  [-0.9, -0.1, 0.0, 0.0],
+                  [0.8, 0.2, 0.0, 0.0],
+                  [0.7, 0.3, 0.0, 0.0],
+                  [-0.6, -0.4, 0.0, 0.0]]
+
+        actual = continuous_quaternions(values)
+
+        self.assertEqual([1.0, 0.9, 0.8, 0.7, 0.6], actual[:, 0].tolist())
+        self.assertEqual([0.0, 0.1, 0.2, 0.3, 0.4], actual[:, 1].tolist())
+        self.assertEqual((0, 4), continuous_quaternions([]).shape)
+
+    def test_create_time_coded_bit_channel_stores_toggles(self):
+        channel = get_animation_bit_channel_no_pad()
+        channel.first_frame = 2
+        channel.last_frame = 9
+
+        actual = create_time_coded_bit_channel(channel, 16)
+
+        self.assertEqual(1, actual.default_value)
+        self.assertEqual(2, actual.num_time_codes)
+        self.assertEqual([0, 9], [datum.time_code for datum in actual.time_codes])
+        self.assertEqual([True, False], [datum.value for datum in actual.time_codes])
+
+        channel = get_animation_bit_channel()
+        actual = create_time_coded_bit_channel(channel, 10)
+        self.assertEqual(0, actual.default_value)
+        self.assertEqual(list(range(10)), [datum.time_code for datum in actual.time_codes])
+
+    def test_create_time_coded_bit_channel_uses_visibility_threshold(self):
+        channel = AnimationBitChannel(last_frame=3, data=[0.0, VISIBILITY_THRESHOLD, 0.7, 0.3])
+
+        actual = create_time_coded_bit_channel(channel, 4)
+
+        self.assertEqual([0, 1, 3], [datum.time_code for datum in actual.time_codes])
+        self.assertEqual([False, True, False], [datum.value for datum in actual.time_codes])
+
+    def test_create_adaptive_delta_animation(self):
+        animation = get_animation()
+
+        actual = create_adaptive_delta_animation(self, animation, 1.0, 90.0)
+
+        self.assertEqual(ADAPTIVE_DELTA_FLAVOR, actual.header.flavor)
+        self.assertEqual(animation.header.name, actual.header.name)
+        self.assertEqual(animation.header.hierarchy_name, actual.header.hierarchy_name)
+        self.assertEqual(animation.header.num_frames, actual.header.num_frames)
+        self.assertEqual(animation.header.frame_rate, actual.header.frame_rate)
+        self.assertEqual(11, len(actual.adaptive_delta_channels))
+        self.assertEqual(2, len(actual.time_coded_bit_channels))
+        self.assertTrue(actual.validate(self))
+
+        for i, channel in enumerate(actual.adaptive_delta_channels):
+            expected = animation.channels[i]
+            self.assertEqual(expected.pivot, channel.pivot)
+            self.assertEqual(expected.type, channel.type)
+            self.assertEqual(expected.vector_len, channel.vector_len)
+            self.assertEqual(animation.header.num_frames, channel.num_time_codes)
+
+    def test_create_adaptive_delta_channel_is_within_reported_error(self):
+        for type in [0, 6]:
+            channel = get_animation_channel(type=type)
+            values = channel_values(channel, 5)
+
+            (actual, error) = create_adaptive_delta_channel(channel, 5)
+
+            decoded = decode(actual.type, actual.vector_len, actual.num_time_codes, actual.scale, actual.data)
+            self.assertEqual(values.shape, decoded.shape)
+            self.assertTrue(abs(values - decoded).max() <= error + 1e-6)
+
+    def test_create_adaptive_delta_animation_write_read(self):
+        expected = create_adaptive_delta_animation(self, get_animation(), 1.0, 90.0)
+
+        io_stream = io.BytesIO()
+        expected.write(io_stream)
+        io_stream = io.BytesIO(io_stream.getvalue())
+
+        (chunk_type, chunk_size, chunk_end) = read_chunk_head(io_stream)
+        self.assertEqual(W3D_CHUNK_COMPRESSED_ANIMATION, chunk_type)
+        self.assertEqual(expected.size(), chunk_size)
+
+        actual = CompressedAnimation.read(self, io_stream, chunk_end)
+        self.assertEqual(len(expected.adaptive_delta_channels), len(actual.adaptive_delta_channels))
+        self.assertEqual(len(expected.time_coded_bit_channels), len(actual.time_coded_bit_channels))
+
+    def test_user_is_notified_if_adaptive_delta_error_exceeds_tolerance(self):
+        animation = get_animation_minimal()
+
+        with (patch.object(self, 'warning')) as warning_func:
+            actual = create_adaptive_delta_animation(self, animation, translation_tolerance=0.0)
+            warning_func.assert_called()
+        self.assertEqual(ADAPTIVE_DELTA_FLAVOR, actual.header.flavor)
+
+        with (patch.object(self, 'warning')) as warning_func:
+            actual = create_adaptive_delta_animation(self, animation, translation_tolerance=1.0)
+            warning_func.assert_not_called()
+        self.assertEqual(ADAPTIVE_DELTA_FLAVOR, actual.header.flavor)
+
+    def test_create_adaptive_delta_animation_names_channels_exceeding_tolerance(self):
+        animation = get_animation_minimal()
+        animation.header.num_frames = 60
+        animation.channels = [
+            AnimationChannel(pivot=1, type=CHANNEL_X, last_frame=59,
+                             data=(0.1 * np.sin(np.arange(60) / 60.0 * 2.0 * math.pi)).tolist()),
+            AnimationChannel(pivot=2, type=CHANNEL_Y, last_frame=59,
+                             data=np.sin(np.arange(60) / 60.0 * 2.0 * math.pi).tolist())]
+
+        with (patch.object(self, 'warning')) as warning_func:
+            actual = create_adaptive_delta_animation(self, animation)
+            warning_func.assert_called_once()
+            message = warning_func.call_args[0][0]
+
+        self.assertFalse('pivot: 1' in message)
+        self.assertTrue('pivot: 2' in message)
+        self.assertEqual(ADAPTIVE_DELTA_FLAVOR, actual.header.flavor)
+        self.assertEqual(2, len(actual.adaptive_delta_channels))
+        self.assertEqual(0, len(actual.time_coded_channels))
+
+    def test_create_adaptive_delta_animation_of_smooth_animation_with_default_tolerances(self):
+        animation = get_animation_minimal()
+        animation.header.num_frames = 120
+        angles = np.radians(10.0) * np.sin(np.arange(120) / 120.0 * 2.0 * math.pi)
+        animation.channels = [
+            AnimationChannel(type=CHANNEL_X, last_frame=119,
+                             data=(0.1 * np.sin(np.arange(120) / 120.0 * 2.0 * math.pi)).tolist()),
+            AnimationChannel(type=CHANNEL_Q, vector_len=4, last_frame=119,
+                             data=[get_quat(math.cos(angle / 2.0), 0, 0, math.sin(angle / 2.0)) for angle in angles])]
+
+        with (patch.object(self, 'warning')) as warning_func:
+            actual = create_adaptive_delta_animation(self, animation)
+            warning_func.assert_not_called()
+
+        io_stream = io.BytesIO()
+        actual.write(io_stream)
+        io_stream = io.BytesIO(io_stream.getvalue())
+        (_, _, chunk_end) = read_chunk_head(io_stream)
+        actual = CompressedAnimation.read(self, io_stream, chunk_end)
+
+        self.assertEqual(ADAPTIVE_DELTA_FLAVOR, actual.header.flavor)
+        self.assertEqual(2, len(actual.adaptive_delta_channels))
+        for channel, expected in zip(actual.adaptive_delta_channels, animation.channels):
+            decoded = decode(channel.type, channel.vector_len, channel.num_time_codes, channel.scale, channel.data)
+            values = channel_values(expected, 120)
+            if channel.type == CHANNEL_Q:
+                self.assertTrue(rotation_angles(values, decoded).max() <= math.radians(ROTATION_TOLERANCE))
+            else:
+                self.assertTrue(np.abs(decoded - values).max() <= TRANSLATION_TOLERANCE)
+
+    def test_create_adaptive_delta_channel_searches_scale_for_tolerance(self):
+        channel = AnimationChannel(type=CHANNEL_X, last_frame=59,
+                                   data=np.sin(np.arange(60) / 60.0 * 2.0 * math.pi).tolist())
+
+        (_, error) = create_adaptive_delta_channel(channel, 60)
+        (actual, searched_error) = create_adaptive_delta_channel(channel, 60, tolerance=0.0)
+
+        self.assertTrue(searched_error < error)
+        decoded = decode(actual.type, actual.vector_len, actual.num_time_codes, actual.scale, actual.data)
+        self.assertTrue(np.abs(decoded - channel.data).max() <= searched_error + 1e-6)
+
+    def test_reduce_key_frames_drops_inner_frames_of_linear_segments(self):
+        values = np.array([1.0, 1.0, 1.0, 2.0, 3.0, 3.0, 3.0, 3.0])
+
+        self.assertEqual([0, 2, 4, 7], reduce_key_frames(values, 0.0).tolist())
+        self.assertEqual([0], reduce_key_frames(np.array([5.0]), 0.0).tolist())
+
+    def test_reduce_key_frames_is_within_tolerance(self):
+        frames = np.arange(100)
+        values = np.sin(frames / 10.0)
+
+        actual = reduce_key_frames(values, 0.01)
+
+        self.assertTrue(len(actual) < 50)
+        self.assertTrue(np.abs(np.interp(frames, actual, values[actual]) - values).max() <= 0.01)
+
+    def test_reduce_key_frames_quaternion(self):
+        angles = np.linspace(0.0, 2.0, 50)
+        values = np.stack([np.cos(angles / 2), np.sin(angles / 2), np.zeros(50), np.zeros(50)], axis=1)
+        values[25:] *= -1.0
+
+        self.assertEqual([0, 49], reduce_key_frames(values, math.radians(0.1)).tolist())
+
+        values[10] = [1.0, 0.0, 0.0, 0.0]
+        self.assertEqual([0, 9, 10, 11, 49], reduce_key_frames(values, math.radians(0.1)).tolist())
+
+    def test_create_time_coded_channel(self):
+        channel = get_animation_channel(type=6)
+        channel.data = [channel.data[0]] * 4 + channel.data
+
+        actual = create_time_coded_channel(channel, 12, math.radians(0.1))
+
+        self.assertEqual(CHANNEL_Q, actual.type)
+        self.assertEqual(channel.pivot, actual.pivot)
+        self.assertEqual(4, actual.vector_len)
+        self.assertEqual([0, 4, 5, 6, 7, 8, 11], [datum.time_code for datum in actual.time_codes])
+        self.assertEqual(len(actual.time_codes), actual.num_time_codes)
+        compare_rotations(self, channel.data[-1], actual.time_codes[-1].value)
+
+    def test_create_time_coded_animation(self):
+        animation = get_animation()
+        for channel in animation.channels:
+            if isinstance(channel, AnimationChannel) and channel.type != CHANNEL_Q:
+                channel.data = [1.0, 2.0, 3.0, 4.0, 5.0]
+
+        with (patch.object(self, 'info')) as info_func:
+            actual = create_time_coded_animation(self, animation)
+            info_func.assert_called_once()
+
+        self.assertEqual(TIME_CODED_FLAVOR, actual.header.flavor)
+        self.assertEqual(11, len(actual.time_coded_channels))
+        self.assertEqual(2, len(actual.time_coded_bit_channels))
+        self.assertTrue(actual.validate(self))
+
+        for channel in actual.time_coded_channels:
+            if channel.type != CHANNEL_Q:
+                self.assertEqual([0, 4], [datum.time_code for datum in channel.time_codes])
+
+    def test_create_auto_compressed_animation_picks_smallest(self):
+        animation = get_animation()
+
+        actual = create_auto_compressed_animation(self, animation)
+        self.assertTrue(isinstance(actual, Animation))
+
+        for channel in animation.channels:
+            if isinstance(channel, AnimationChannel):
+                channel.data = [channel.data[0]] * 60
+                channel.last_frame = channel.first_frame + 59
+        animation.header.num_frames = 60
+
+        actual = create_auto_compressed_animation(self, animation)
+        self.assertTrue(isinstance(actual, CompressedAnimation))
+        self.assertTrue(animation_size(actual) < animation_size(animation))
+        self.assertTrue(actual.validate(self))
+
+    def test_create_auto_compressed_animation_does_not_pick_motion_channels(self):
+        animation = get_animation_minimal()
+        animation.header.num_frames = 64
+        animation.channels = [
+            AnimationChannel(type=CHANNEL_X, last_frame=63, data=[1.0] * 32 + [2.0] * 32),
+            AnimationChannel(type=CHANNEL_Y, last_frame=63, data=np.sin(np.arange(64) / 4.0).tolist()),
+            get_animation_bit_channel()]
+
+        with (patch.object(self, 'info')) as info_func:
+            actual = create_auto_compressed_animation(self, animation, translation_tolerance=0.1)
+            self.assertEqual(3, info_func.call_count)
+            for call in info_func.call_args_list[:2]:
+                self.assertTrue('U: ' in call[0][0] and 'TC: ' in call[0][0] and 'AD: ' in call[0][0])
+
+        self.assertEqual(0, actual.header.version.major)
+        self.assertEqual(1, actual.header.version.minor)
+        self.assertEqual(0, len(actual.motion_channels))
+        self.assertEqual(1, len(actual.time_coded_bit_channels))
+        self.assertTrue(actual.validate(self))
+
+    def test_create_auto_compressed_animation_reports_sizes_of_every_channel(self):
+        animation = get_animation()
+        num_channels = len([channel for channel in animation.channels if isinstance(channel, AnimationChannel)])
+
+        with (patch.object(self, 'info')) as info_func:
+            actual = create_auto_compressed_animation(self, animation)
+            self.assertEqual(num_channels + 1, info_func.call_count)
+            for call in info_func.call_args_list[:num_channels]:
+                self.assertTrue('stored as U: saves 0 bytes' in call[0][0])
+
+        self.assertTrue(isinstance(actual, Animation))
+
+    def test_eliminate_redundant_channels(self):
+        animation = get_animation()
+        animation.channels = [
+            AnimationChannel(type=CHANNEL_X, last_frame=2, data=[0.0, 0.0005, -0.0005]),
+            AnimationChannel(type=CHANNEL_Y, last_frame=2, data=[2.0, 2.0, 2.0]),
+            AnimationChannel(type=CHANNEL_Z, last_frame=2, data=[1.0, 2.0, 3.0]),
+            AnimationChannel(type=CHANNEL_Q, vector_len=4, last_frame=1,
+                             data=[get_quat(1, 0, 0, 0), get_quat(-1, 0, 0, 0)]),
+            get_animation_bit_channel()]
+
+        with (patch.object(self, 'info')) as info_func:
+            eliminate_redundant_channels(self, animation)
+            info_func.assert_called_once()
+
+        self.assertEqual([CHANNEL_Y, CHANNEL_Z], [channel.type for channel in animation.channels[:2]])
+        self.assertEqual([2.0, 2.0, 2.0], animation.channels[0].data)
+        self.assertEqual(2, animation.channels[0].last_frame)
+        self.assertEqual(3, len(animation.channels[1].data))
+        self.assertTrue(isinstance(animation.channels[2], AnimationBitChannel))
+
+    def test_eliminate_redundant_channels_keeps_constant_channel_out_of_rest_on_every_frame(self):
+        animation = get_animation_minimal()
+        animation.header.num_frames = 5
+        animation.channels = [
+            AnimationChannel(type=CHANNEL_X, last_frame=4, data=[2.0] * 5),
+            AnimationChannel(type=CHANNEL_Q, vector_len=4, last_frame=4, data=[get_quat(0.8, 0.6, 0, 0)] * 5)]
+
+        eliminate_redundant_channels(self, animation)
+
+        io_stream = io.BytesIO()
+        animation.write(io_stream)
+        io_stream = io.BytesIO(io_stream.getvalue())
+        (_, _, chunk_end) = read_chunk_head(io_stream)
+        actual = Animation.read(self, io_stream, chunk_end)
+
+        self.assertEqual(2, len(actual.channels))
+        for channel in actual.channels:
+            self.assertEqual(0, channel.first_frame)
+            self.assertEqual(4, channel.last_frame)
+        for frame in range(5):
+            self.assertAlmostEqual(2.0, actual.channels[0].data[frame])
+            compare_quats(self, get_quat(0.8, 0.6, 0, 0), actual.channels[1].data[frame])
+
+    def test_eliminate_redundant_channels_time_coded(self):
+        animation = get_compressed_animation(bit_channels=False)
+        channel = animation.time_coded_channels[3]
+        channel.time_codes = [TimeCodedDatum(time_code=i, value=get_quat(0.8, 0.6, 0, 0)) for i in range(4)]
+        channel.num_time_codes = 4
+
+        eliminate_redundant_channels(self, animation)
+
+        self.assertEqual(CHANNEL_Q, channel.type)
+        self.assertTrue(channel in animation.time_coded_channels)
+        self.assertEqual(1, channel.num_time_codes)
+        self.assertEqual(1, len(channel.time_codes))
+
+    def test_eliminate_redundant_channels_keeps_constant_hidden_visibility(self):
+        animation = get_animation()
+        animation.channels = [
+            AnimationChannel(type=CHANNEL_X, last_frame=2, data=[1.0, 2.0, 3.0]),
+            AnimationChannel(type=CHANNEL_VIS, last_frame=2, data=[0.0, 0.0, 0.0])]
+
+        eliminate_redundant_channels(self, animation)
+
+        self.assertEqual([CHANNEL_X, CHANNEL_VIS], [channel.type for channel in animation.channels])
+        self.assertEqual([0.0, 0.0, 0.0], animation.channels[1].data)
+
+        animation = get_compressed_animation(bit_channels=False)
+        channel = TimeCodedAnimationChannel(num_time_codes=2, pivot=1, vector_len=1, type=CHANNEL_VIS,
+                                            time_codes=[TimeCodedDatum(time_code=0, value=0.0),
+                                                        TimeCodedDatum(time_code=4, value=0.0)])
+        animation.time_coded_channels.append(channel)
+
+        eliminate_redundant_channels(self, animation)
+
+        self.assertTrue(channel in animation.time_coded_channels)
+        self.assertEqual(2, channel.num_time_codes)
+
+    def test_eliminate_redundant_channels_keeps_one_channel(self):
+        animation = get_animation()
+        animation.channels = [
+            AnimationChannel(type=CHANNEL_X, last_frame=2, data=[0.0, 0.0, 0.0]),
+            AnimationChannel(type=CHANNEL_Y, last_frame=2, data=[0.0, 0.0, 0.0])]
+
+        eliminate_redundant_channels(self, animation)
+
+        self.assertEqual(1, len(animation.channels))
+        self.assertEqual([0.0], animation.channels[0].data)
+        self.assertTrue(animation.validate(self))
+
+    def test_create_motion_channel_picks_delta_type(self):
+        channel = AnimationChannel(type=CHANNEL_X, last_frame=63, data=[1.0] * 32 + [2.0] * 32)
+        actual = create_motion_channel(channel, 64)
+        self.assertEqual(0, actual.delta_type)
+        self.assertEqual([0, 31, 32, 63], [datum.time_code for datum in actual.data])
+
+        channel.data = np.sin(np.arange(64) / 4.0).tolist()
+        actual = create_motion_channel(channel, 64, 0.001, 0.1)
+        self.assertEqual(1, actual.delta_type)
+        self.assertEqual(64, actual.num_time_codes)
+
+        actual = create_motion_channel(channel, 64, 0.001, 0.01)
+        self.assertEqual(2, actual.delta_type)
+
+    def test_create_motion_channel_animation_write_read(self):
+        animation = get_animation()
+
+        with (patch.object(self, 'info')) as info_func:
+            expected = create_motion_channel_animation(self, animation)
+            info_func.assert_called_once()
+
+        self.assertEqual(1, expected.header.version.major)
+        self.assertEqual(0, expected.header.version.minor)
+        self.assertEqual(11, len(expected.motion_channels))
+        self.assertEqual(2, len(expected.time_coded_bit_channels))
+        self.assertTrue(expected.validate(self))
+
+        io_stream = io.BytesIO()
+        expected.write(io_stream)
+        io_stream = io.BytesIO(io_stream.getvalue())
+
+        (chunk_type, chunk_size, chunk_end) = read_chunk_head(io_stream)
+        self.assertEqual(expected.size(), chunk_size)
+
+        actual = CompressedAnimation.read(self, io_stream, chunk_end)
+        self.assertEqual(len(expected.motion_channels), len(actual.motion_channels))
+        for i, channel in enumerate(actual.motion_channels):
+            self.assertEqual(expected.motion_channels[i].delta_type, channel.delta_type)
+            self.assertEqual(expected.motion_channels[i].pivot, channel.pivot)
+            self.assertEqual(expected.motion_channels[i].num_time_codes, channel.num_time_codes)
@@ -2,7 +2,6 @@
 # Written by Stephan Vedder and Michael Schnabel
 
 import bpy
-import bmesh
 from shutil import copyfile
 
 from io_mesh_w3d.import_utils import *
@@ -28,13 +27,11 @@ class TestImportUtilsW3D(TestCase):
         mesh.from_pydata(verts, [], triangles)
         mesh.update()
         mesh.validate()
-        b_mesh = bmesh.new()
-        b_mesh.from_mesh(mesh)
 
         mesh_struct.material_passes[0].tx_stages.append(get_texture_stage())
 
         for mat_pass in mesh_struct.material_passes:
-            create_uvlayer(self, mesh, b_mesh, triangles, mat_pass)
+            create_uvlayer(self, mesh, triangles, mat_pass)
 
     def test_mesh_import_2_textures_1_vertex_material(self):
         mesh = get_mesh_two_textures()
@@ -46,6 +43,21 @@ class TestImportUtilsW3D(TestCase):
 
         create_mesh(self, mesh, bpy.context.collection)
 
+    def test_mesh_import_2_textures_sets_material_indices(self):
+        mesh = get_mesh_two_textures()
+        mesh.material_passes[0].tx_stages[0].tx_ids = [[1, 0, 1]]
+
+        copyfile(up(up(self.relpath())) + '/testfiles/texture.dds',
+                 self.outpath() + 'texture.dds')
+        copyfile(up(up(self.relpath())) + '/testfiles/texture.dds',
+                 self.outpath() + 'texture2.dds')
+
+        create_mesh(self, mesh, bpy.context.collection)
+
+        polygons = bpy.data.meshes[mesh.name()].polygons
+        expected = [1, 0, 1] + [1] * (len(polygons) - 3)
+        self.assertEqual(expected, [polygon.material_index for polygon in polygons])
+
     def test_prelit_mesh_import(self):
         mesh = get_mesh(prelit=True)
 
@@ -88,8 +100,6 @@ class TestImportUtilsW3D(TestCase):
         meshes = [get_mesh(name='MESH_Obj')]
 
         expected_frames = [0, 4]
-        if bpy.app.version >= (4, 2, 0):
-            expected_frames = [0]
         expected = [3.0, 3.0]
 
         self.filepath = self.outpath() + 'output'
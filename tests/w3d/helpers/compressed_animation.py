@@ -43,11 +43,13 @@ def get_time_coded_datum(time_code, type=0, random_interpolation=True):
     return datum
 
 
-def compare_time_coded_datums(self, type, expected, actual):
+def compare_time_coded_datums(self, type, expected, actual, up_to_sign=False):
     self.assertEqual(expected.time_code, actual.time_code)
     self.assertEqual(expected.interpolated, actual.interpolated)
 
-    if type == 6:
+    if type == 6 and up_to_sign:
+        compare_rotations(self, expected.value, actual.value)
+    elif type == 6:
         compare_quats(self, expected.value, actual.value)
     else:
         self.assertAlmostEqual(expected.value, actual.value, 2)
@@ -98,7 +100,7 @@ def get_time_coded_animation_channel_empty():
         time_codes=[])
 
 
-def compare_time_coded_animation_channels(self, expected, actual):
+def compare_time_coded_animation_channels(self, expected, actual, up_to_sign=False):
     self.assertEqual(expected.num_time_codes, actual.num_time_codes)
     self.assertEqual(expected.pivot, actual.pivot)
     self.assertEqual(expected.vector_len, actual.vector_len)
@@ -107,7 +109,7 @@ def compare_time_coded_animation_channels(self, expected, actual):
     self.assertEqual(len(expected.time_codes), len(actual.time_codes))
     for i in range(len(expected.time_codes)):
         compare_time_coded_datums(
-            self, expected.type, expected.time_codes[i], actual.time_codes[i])
+            self, expected.type, expected.time_codes[i], actual.time_codes[i], up_to_sign)
 
 
 def get_time_coded_bit_datum():
@@ -316,7 +318,7 @@ def get_motion_channel_empty():
         data=[])
 
 
-def compare_motion_channels(self, expected, actual):
+def compare_motion_channels(self, expected, actual, up_to_sign=False):
     self.assertEqual(expected.delta_type, actual.delta_type)
     self.assertEqual(expected.type, actual.type)
     self.assertEqual(expected.num_time_codes, actual.num_time_codes)
@@ -326,7 +328,7 @@ def compare_motion_channels(self, expected, actual):
         self.assertEqual(len(expected.data), len(actual.data))
         for i in range(len(expected.data)):
             compare_time_coded_datums(
-                self, expected.type, expected.data[i], actual.data[i])
+                self, expected.type, expected.data[i], actual.data[i], up_to_sign)
     else:
         compare_adaptive_delta_motion_animation_channels(
             self, expected.data, actual.data, expected.type)
@@ -427,13 +429,13 @@ def get_compressed_animation_empty(hierarchy_name='TestHierarchy'):
         motion_channels=[])
 
 
-def compare_compressed_animations(self, expected, actual):
+def compare_compressed_animations(self, expected, actual, up_to_sign=False):
     compare_compressed_animation_headers(self, expected.header, actual.header)
     self.assertEqual(len(expected.time_coded_channels),
                      len(actual.time_coded_channels))
     for i in range(len(expected.time_coded_channels)):
         compare_time_coded_animation_channels(
-            self, expected.time_coded_channels[i], actual.time_coded_channels[i])
+            self, expected.time_coded_channels[i], actual.time_coded_channels[i], up_to_sign)
     self.assertEqual(len(expected.adaptive_delta_channels),
                      len(actual.adaptive_delta_channels))
     for i in range(len(expected.adaptive_delta_channels)):
@@ -449,4 +451,4 @@ def compare_compressed_animations(self, expected, actual):
                      len(actual.motion_channels))
     for i in range(len(expected.motion_channels)):
         compare_motion_channels(
-            self, expected.motion_channels[i], actual.motion_channels[i])
+            self, expected.motion_channels[i], actual.motion_channels[i], up_to_sign)